@@ -0,0 +1,83 @@
+import time
+
+
+class TimingData:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def add(self, elapsed_ms: float):
+        if self.count == 0 or elapsed_ms < self.min_ms:
+            self.min_ms = elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.last_ms = elapsed_ms
+
+    def average(self) -> float:
+        return self.total_ms / self.count if self.count > 0 else 0.0
+
+    def __str__(self):
+        return f"count: {self.count}, avg: {self.average():.1f}ms, min: {self.min_ms:.1f}ms, max: {self.max_ms:.1f}ms, last: {self.last_ms:.1f}ms"
+
+
+class Metrics:
+    """
+    Process wide counters and timings so we can see what the app is actually doing.
+    Everything is keyed by a dotted name, like "radar.refresh".
+    """
+    counters: dict[str, int] = {}
+    gauges: dict[str, float] = {}
+    timings: dict[str, TimingData] = {}
+
+    @staticmethod
+    def now() -> float:
+        return time.perf_counter()
+
+    @staticmethod
+    def elapsedMs(start: float) -> float:
+        return (time.perf_counter() - start) * 1000.0
+
+    @staticmethod
+    def increment(name: str, amount: int = 1):
+        Metrics.counters[name] = Metrics.counters.get(name, 0) + amount
+
+    @staticmethod
+    def getCounter(name: str) -> int:
+        return Metrics.counters.get(name, 0)
+
+    @staticmethod
+    def setGauge(name: str, value: float):
+        Metrics.gauges[name] = value
+
+    @staticmethod
+    def getGauge(name: str) -> float:
+        return Metrics.gauges.get(name, 0.0)
+
+    @staticmethod
+    def recordTiming(name: str, elapsed_ms: float):
+        if name not in Metrics.timings:
+            Metrics.timings[name] = TimingData()
+        Metrics.timings[name].add(elapsed_ms)
+
+    @staticmethod
+    def getTiming(name: str) -> TimingData:
+        return Metrics.timings.get(name, TimingData())
+
+    @staticmethod
+    def report(prefix: str = "") -> str:
+        lines = []
+        for name in sorted(Metrics.counters):
+            if name.startswith(prefix):
+                lines.append(f"{name}: {Metrics.counters[name]}")
+        for name in sorted(Metrics.gauges):
+            if name.startswith(prefix):
+                lines.append(f"{name}: {Metrics.gauges[name]}")
+        for name in sorted(Metrics.timings):
+            if name.startswith(prefix):
+                lines.append(f"{name}: {Metrics.timings[name]}")
+        return "\n".join(lines)
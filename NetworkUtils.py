@@ -0,0 +1,161 @@
+import heapq
+from typing import Callable
+
+from PyQt6.QtCore import QObject, QUrl
+from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+
+from MetricsUtils import Metrics
+
+# Qt itself never opens more than 6 connections to a host.
+DEFAULT_MAX_PER_HOST = 6
+
+# Qt never times a request out unless asked to, so one hung server would hold its request open forever.
+# Requests that set a timeout of their own, like radar tiles, keep theirs.
+DEFAULT_TRANSFER_TIMEOUT_MS = 30000
+
+
+class Priority:
+    HIGH = 0     # Small things someone is waiting on, like weather and the radar manifest.
+    NORMAL = 1
+    LOW = 2      # Bulk downloads, like radar tiles.
+
+
+class NetworkRequestData:
+    def __init__(self, request: QNetworkRequest, callback: Callable[[QNetworkReply], None], priority: int, sequence: int, host: str):
+        self.request = request
+        self.callback = callback
+        self.priority = priority
+        self.sequence = sequence
+        # The host the request was made for, even when base_urls sends it somewhere else.
+        self.host = host
+        self.reply = None
+        self.cancelled = False
+        self.queued_at = Metrics.now()
+        self.sent_at = 0.0
+
+    def __lt__(self, other):
+        # Higher priority first, then first come first served.
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class NetworkService(QObject):
+    """
+    One QNetworkAccessManager for the whole process, so every provider shares its keep-alive connections and TLS sessions.
+    Requests wait in a priority queue until their host has room under its cap, then go out in priority order.
+    Every reply is counted per host: requests, bytes, status codes, errors, time queued and time on the wire.
+    A request that goes DEFAULT_TRANSFER_TIMEOUT_MS without any data gets aborted, and calls back with the error.
+    Callbacks get the finished reply, and the reply is deleted once the callback returns.
+    Hosts can be pointed at other servers with setBaseUrls(), like a local stand-in for testing with no network.
+    """
+    instance = None
+
+    @staticmethod
+    def getService():
+        if NetworkService.instance is None:
+            NetworkService.instance = NetworkService()
+        return NetworkService.instance
+
+    def __init__(self):
+        super().__init__()
+        self.net_man = QNetworkAccessManager(self)
+        self.net_man.setTransferTimeout(DEFAULT_TRANSFER_TIMEOUT_MS)
+        self.queue = []
+        self.sequence = 0
+        self.in_flight = {}
+        self.host_counts = {}
+        self.host_limits = {}
+        self.base_urls = {}
+
+    def setBaseUrls(self, base_urls: dict[str, str] | None):
+        # Host to base url, like {"api.rainviewer.com": "http://127.0.0.1:8765"}.
+        self.base_urls = {host: QUrl(base_url) for host, base_url in (base_urls or {}).items()}
+
+    def getUrl(self, url: QUrl) -> QUrl:
+        base_url = self.base_urls.get(url.host())
+        if base_url is None:
+            return url
+
+        url = QUrl(url)
+        url.setScheme(base_url.scheme())
+        url.setHost(base_url.host())
+        url.setPort(base_url.port())
+        if base_url.path().strip("/") != "":
+            url.setPath(base_url.path().rstrip("/") + url.path())
+        return url
+
+    def setHostLimit(self, host: str, max_requests: int):
+        self.host_limits[host] = max(1, max_requests)
+        self.startRequests()
+
+    def get(self, request: QNetworkRequest, callback: Callable[[QNetworkReply], None], priority: int = Priority.NORMAL) -> NetworkRequestData:
+        self.sequence += 1
+        # Caps and metrics go by the host that was asked for, so a stand-in serving every host doesn't lump them together.
+        host = request.url().host()
+        if len(self.base_urls) > 0:
+            request.setUrl(self.getUrl(request.url()))
+        request_data = NetworkRequestData(request, callback, priority, self.sequence, host)
+        heapq.heappush(self.queue, request_data)
+        self.startRequests()
+        return request_data
+
+    def cancel(self, request_data: NetworkRequestData):
+        # Queued requests are just marked, in flight ones get aborted. Either way the callback never fires.
+        request_data.cancelled = True
+        reply = request_data.reply
+        if reply is not None and reply in self.in_flight:
+            del self.in_flight[reply]
+            self.host_counts[request_data.host] -= 1
+            reply.finished.disconnect()
+            reply.abort()
+            reply.deleteLater()
+            Metrics.increment(f"net.{request_data.host}.cancelled")
+            self.startRequests()
+
+    def isBusy(self) -> bool:
+        return len(self.queue) > 0 or len(self.in_flight) > 0
+
+    def startRequests(self):
+        # Walk the queue in priority order, starting anything whose host still has room.
+        waiting = []
+        while len(self.queue) > 0:
+            request_data = heapq.heappop(self.queue)
+            if request_data.cancelled:
+                continue
+
+            host = request_data.host
+            if self.host_counts.get(host, 0) < self.host_limits.get(host, DEFAULT_MAX_PER_HOST):
+                self.host_counts[host] = self.host_counts.get(host, 0) + 1
+                request_data.sent_at = Metrics.now()
+                Metrics.recordTiming(f"net.{host}.queued", (request_data.sent_at - request_data.queued_at) * 1000.0)
+                request_data.reply = self.net_man.get(request_data.request)
+                self.in_flight[request_data.reply] = request_data
+                request_data.reply.finished.connect(lambda reply = request_data.reply: self.onFinished(reply))
+            else:
+                waiting.append(request_data)
+
+        # Popped in order, so it is still a heap.
+        self.queue = waiting
+
+    def onFinished(self, reply: QNetworkReply):
+        request_data = self.in_flight.pop(reply, None)
+        if request_data is None:
+            return
+
+        host = request_data.host
+        self.host_counts[host] -= 1
+
+        Metrics.increment(f"net.{host}.requests")
+        Metrics.increment(f"net.{host}.bytes", reply.bytesAvailable())
+        Metrics.recordTiming(f"net.{host}.latency", Metrics.elapsedMs(request_data.sent_at))
+        status = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+        if status is not None:
+            Metrics.increment(f"net.{host}.status.{status}")
+        if reply.error() != QNetworkReply.NetworkError.NoError:
+            Metrics.increment(f"net.{host}.errors")
+
+        # Fill the free slot before handing the reply back, so the pipe stays full.
+        self.startRequests()
+
+        if callable(request_data.callback):
+            request_data.callback(reply)
+        reply.deleteLater()
@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QEventLoop, QSize, QTimer
+from PyQt6.QtGui import QPixmap, QPixmapCache
+from PyQt6.QtWidgets import QApplication, QLabel
+
+import assets.AssetUtils
+from MetricsUtils import Metrics
+from NetworkUtils import NetworkService
+from assets.CacheManager import CacheManager
+from configs.ConfigUtils import AppColorUtils, AppSettings, Config, LocationUtils, WxSettings
+from radars.RadarData import SizeData
+from radars.RadarTileCache import RadarTileCache
+from radars.RainViewerManifest import RainViewerManifest
+from radars.RainViewerRadarProvider import RainViewerRadarProvider
+from widgets.RadarWidget import RadarWidget
+
+# Every host the radar talks to, all pointed at the stand-in.
+RADAR_HOSTS = ["api.rainviewer.com", "www.rainviewer.com"]
+
+# Our two radars' zoom levels, see radar_0_zoom and radar_1_zoom.
+ZOOMS = [10, 6]
+TILE_SIZES = [256, 512]
+
+# Longest a single refresh gets before we call it stuck.
+REFRESH_TIMEOUT_MS = 5 * 60 * 1000
+
+
+class RadarBenchmark:
+    """
+    Times cold radar refreshes against a StandInServer, to compare the tile sizes at the zooms we run.
+    Every run starts from empty caches in a scratch folder, so every tile gets fetched, and the real caches are left alone.
+    The stand-in runs in its own process, so making up tiles never competes with us for the GIL.
+    It can also time RadarWidget.tick() over the frames a refresh brought in, against loading each frame's PNG like ticks used to.
+    """
+    def __init__(self, port: int, latency_ms: int, bandwidth_kbps: int, size: QSize):
+        self.port = port
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.latency_ms = latency_ms
+        self.bandwidth_kbps = bandwidth_kbps
+        self.size = size
+        self.server = None
+        self.scratch_dir = tempfile.mkdtemp(prefix = "radar_benchmark_")
+
+    def startServer(self):
+        server_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "StandInServer.py")
+        self.server = subprocess.Popen([
+            sys.executable, server_file,
+            "--port", str(self.port),
+            "--latency", str(self.latency_ms),
+            "--bandwidth", str(self.bandwidth_kbps)
+        ])
+        for _ in range(100):
+            if self.getServerCounts() is not None:
+                return
+            time.sleep(0.1)
+        raise RuntimeError(f"RadarBenchmark.startServer(): no stand-in on {self.base_url}")
+
+    def stopServer(self):
+        if self.server is not None:
+            self.server.terminate()
+            self.server.wait()
+        shutil.rmtree(self.scratch_dir, ignore_errors = True)
+
+    def getServerCounts(self) -> dict[str, int] | None:
+        try:
+            with urllib.request.urlopen(self.base_url + "/stats", timeout = 5) as response:
+                return json.loads(response.read())
+        except (urllib.error.URLError, ConnectionError):
+            return None
+
+    def resetCaches(self, run_name: str):
+        # Fresh caches for every run, in a folder of their own, and nothing left over from the run before.
+        if CacheManager.instance is not None:
+            CacheManager.instance.close()
+        CacheManager.instance = None
+        RadarTileCache.instance = None
+        RainViewerManifest.instance = None
+        assets.AssetUtils.ASSETS_DIR = os.path.join(self.scratch_dir, run_name)
+
+    def runRefresh(self, zoom: int, tile_size: int, run_name: str, config: Config = None) -> tuple[int, float, RainViewerRadarProvider]:
+        # (tile requests, wall ms, provider) for one cold refresh.
+        self.resetCaches(run_name)
+        if config is None:
+            config = RadarBenchmark.getConfig(WxSettings())
+        provider = RainViewerRadarProvider(config)
+        provider.setSize(SizeData(zoom, self.size, tile_size))
+
+        loop = QEventLoop()
+        def onRadar(radar_data_list):
+            if provider.tiles_done and provider.pending_jobs == 0:
+                loop.quit()
+        timeout_timer = QTimer()
+        timeout_timer.setSingleShot(True)
+        timeout_timer.timeout.connect(loop.quit)
+
+        tiles_before = self.getServerCounts().get("tile", 0)
+        refresh_start = Metrics.now()
+        provider.getRadar(onRadar)
+        timeout_timer.start(REFRESH_TIMEOUT_MS)
+        loop.exec()
+        elapsed_ms = Metrics.elapsedMs(refresh_start)
+        if not timeout_timer.isActive():
+            print(f"RadarBenchmark.runRefresh(): zoom {zoom} with {tile_size}px tiles didn't finish in {REFRESH_TIMEOUT_MS // 1000}s")
+        timeout_timer.stop()
+
+        provider.tile_fetcher.abort()
+        provider.watchdog_timer.stop()
+        provider.retry_timer.stop()
+        return self.getServerCounts().get("tile", 0) - tiles_before, elapsed_ms, provider
+
+    @staticmethod
+    def getConfig(wx_settings: WxSettings) -> Config:
+        return Config(AppSettings(LocationUtils.ROCHESTER, AppColorUtils.RED, ""), wx_settings = wx_settings)
+
+    @staticmethod
+    def timeTicks(ticks: int, tick) -> float:
+        # Average ms for one call of tick.
+        tick_start = Metrics.now()
+        for _ in range(ticks):
+            tick()
+        return Metrics.elapsedMs(tick_start) / ticks
+
+    def runTicks(self, ticks: int):
+        NetworkService.getService().setBaseUrls(dict.fromkeys(RADAR_HOSTS, self.base_url))
+        print(f"{self.size.width()}x{self.size.height()} radar at zoom {ZOOMS[0]}, average of {ticks} ticks")
+        for indexed in [False, True]:
+            # Frames get exported as PNGs too, so there is something to load the way ticks used to.
+            config = RadarBenchmark.getConfig(WxSettings(radar_export_png = True, radar_indexed = indexed))
+            _, _, provider = self.runRefresh(ZOOMS[0], TILE_SIZES[0], f"tick_{indexed}", config)
+            frames = [radar_data for radar_data in provider.radar_data_list if radar_data.file_path]
+            frame_kind = "indexed" if indexed else "ARGB32"
+
+            if not indexed:
+                # Before: every tick loaded its frame's PNG, which QPixmapCache only sometimes saved us from decoding.
+                label = QLabel()
+                frame_index = 0
+                def loadTick(clear_cache: bool):
+                    nonlocal frame_index
+                    if clear_cache:
+                        QPixmapCache.clear()
+                    radar_pixmap = QPixmap()
+                    radar_pixmap.load(frames[frame_index].file_path)
+                    label.setPixmap(radar_pixmap)
+                    frame_index = (frame_index + 1) % len(frames)
+                print(f"before, PNG load, QPixmapCache on:      {RadarBenchmark.timeTicks(ticks, lambda: loadTick(False)):.4f}ms")
+                print(f"before, PNG load, QPixmapCache cleared: {RadarBenchmark.timeTicks(ticks, lambda: loadTick(True)):.4f}ms")
+
+            # After: the widget shows the frames the provider holds in memory.
+            radar_widget = RadarWidget(config, ZOOMS[0], TILE_SIZES[0])
+            radar_widget.radar_data_list = provider.radar_data_list
+            print(f"after, RadarWidget.tick(), {frame_kind + ':':8s}     {RadarBenchmark.timeTicks(ticks, radar_widget.tick):.4f}ms over {len(provider.radar_data_list)} frames")
+            radar_widget.cleanup()
+
+    def run(self, runs: int):
+        NetworkService.getService().setBaseUrls(dict.fromkeys(RADAR_HOSTS, self.base_url))
+        print(f"{self.size.width()}x{self.size.height()} radar, {self.latency_ms}ms latency, {self.bandwidth_kbps or 'unlimited'} KB/s, best of {runs} cold refreshes")
+        for zoom in ZOOMS:
+            results = {}
+            for tile_size in TILE_SIZES:
+                # The first go has the stand-in making up tiles, so it only warms it up.
+                self.runRefresh(zoom, tile_size, f"warmup_{zoom}_{tile_size}")
+                requests = []
+                times = []
+                for run in range(runs):
+                    request_count, elapsed_ms, _ = self.runRefresh(zoom, tile_size, f"run_{zoom}_{tile_size}_{run}")
+                    requests.append(request_count)
+                    times.append(elapsed_ms)
+                results[tile_size] = (statistics.median(requests), min(times))
+                print(f"zoom {zoom:2d}, {tile_size}px tiles: {results[tile_size][0]:4.0f} tile requests, {results[tile_size][1]:7.0f}ms")
+            small, large = results[TILE_SIZES[0]], results[TILE_SIZES[1]]
+            print(f"zoom {zoom:2d}, {TILE_SIZES[1]}px vs {TILE_SIZES[0]}px: {small[0] / max(large[0], 1):.1f}x fewer requests, {small[1] / large[1]:.2f}x the speed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Compare cold radar refreshes with 256px and 512px tiles against a local stand-in, or time radar ticks.")
+    parser.add_argument("mode", nargs = "?", choices = ["tiles", "tick"], default = "tiles")
+    parser.add_argument("--port", type = int, default = 8766)
+    parser.add_argument("--latency", type = int, default = 50, help = "ms before every answer")
+    parser.add_argument("--bandwidth", type = int, default = 400, help = "KB a second per connection, 0 for unlimited")
+    parser.add_argument("--width", type = int, default = 640)
+    parser.add_argument("--height", type = int, default = 360)
+    parser.add_argument("--runs", type = int, default = 3)
+    parser.add_argument("--ticks", type = int, default = 500)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    benchmark = RadarBenchmark(args.port, args.latency, args.bandwidth, QSize(args.width, args.height))
+    benchmark.startServer()
+    try:
+        if args.mode == "tick":
+            benchmark.runTicks(args.ticks)
+        else:
+            benchmark.run(args.runs)
+    finally:
+        benchmark.stopServer()
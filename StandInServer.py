@@ -0,0 +1,390 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import struct
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "assets", "fixtures")
+
+# Where record mode goes for each kind of request. Tiles come from whatever host the recorded manifest names.
+UPSTREAM_URLS = {
+    "manifest": "https://api.rainviewer.com",
+    "colors": "https://www.rainviewer.com",
+    "map": "https://maps.googleapis.com",
+    "weather": "https://api.openweathermap.org",
+}
+
+# Query values that change every request or are secret, they never go into a fixture name.
+VOLATILE_PARAMS = {"r", "appid", "key"}
+
+# RainViewer publishes a frame every 10 minutes and keeps 2 hours of them.
+FRAME_SECS = 10 * 60
+FRAME_COUNT = 13
+
+SCHEME_NAMES = [
+    "Black and White", "Original", "Universal Blue", "TITAN", "The Weather Channel",
+    "Meteored", "NEXRAD Level III", "Rainbow @ SELEX-IS", "Dark Sky"
+]
+
+
+class StandInSettings:
+    def __init__(
+            self,
+            port: int = 8765,                      # Port to listen on, on localhost.
+            fixture_dir: str = FIXTURE_DIR,        # Recorded responses are read from and written to here.
+            record: bool = False,                  # Fetch anything we don't have a fixture for from the real server, and keep it.
+            latency_ms: int = 0,                   # Wait this long before answering every request.
+            bandwidth_kbps: int = 0,               # Send bodies no faster than this many KB a second, 0 for as fast as we can.
+            error_rate: float = 0.0,               # Fraction of requests answered with a 503.
+            stall_rate: float = 0.0,               # Fraction of requests that hang for stall_secs before answering.
+            stall_secs: int = 60,
+            seed: int = 0                          # Seeds the error and stall injection, so runs are repeatable.
+    ):
+        self.port = port
+        self.fixture_dir = fixture_dir
+        self.record = record
+        self.latency_ms = latency_ms
+        self.bandwidth_kbps = bandwidth_kbps
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_secs = stall_secs
+        self.seed = seed
+
+
+class StandInUtils:
+    @staticmethod
+    def getKind(path: str) -> str:
+        if path.endswith("weather-maps.json"):
+            return "manifest"
+        if path.startswith("/v2/radar/"):
+            return "tile"
+        if path.endswith("colors_table.csv"):
+            return "colors"
+        if path.startswith("/maps/api/staticmap"):
+            return "map"
+        if path.startswith("/data/"):
+            return "weather"
+        return ""
+
+    @staticmethod
+    def getFixtureName(kind: str, path: str, query: str) -> str:
+        # Same request, same fixture, no matter the cache busting or the api key.
+        params = sorted((name, value) for name, value in parse_qsl(query) if name not in VOLATILE_PARAMS)
+        key = path + "?" + urlencode(params)
+        extension = os.path.splitext(path)[1] or ".png"
+        if kind == "weather":
+            extension = ".json"
+        return os.path.join(kind, os.path.basename(path).split(".")[0] + "_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:12] + extension)
+
+    @staticmethod
+    def getPng(width: int, height: int, rows: list[bytes]) -> bytes:
+        # rows are RGBA, without the filter byte.
+        def chunk(chunk_type: bytes, data: bytes) -> bytes:
+            return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xffffffff)
+
+        raw = b"".join(b"\x00" + row for row in rows)
+        header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+        return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 6)) + chunk(b"IEND", b"")
+
+    @staticmethod
+    def getSchemeColor(scheme: int, dbz: int) -> list[int]:
+        # Scheme 0 is dBZ as a gray level, like RainViewer's, the rest are just ramps that are easy to tell apart.
+        level = max(0, min(255, (dbz + 32) * 2))
+        if scheme == 0:
+            return [level, level, level, 255]
+        hue = (scheme * 40 + level) % 360 / 60.0
+        value = 0.4 + 0.6 * level / 255
+        rising = value * (hue % 1.0)
+        falling = value * (1.0 - hue % 1.0)
+        rgb = [(value, rising, 0), (falling, value, 0), (0, value, rising), (0, falling, value), (rising, 0, value), (value, 0, falling)][int(hue) % 6]
+        return [round(part * 255) for part in rgb] + [255]
+
+    @staticmethod
+    def getColorTable() -> bytes:
+        lines = ["dBZ," + ",".join(SCHEME_NAMES)]
+        for dbz in range(-32, 96):
+            colors = [StandInUtils.getSchemeColor(scheme, dbz) for scheme in range(len(SCHEME_NAMES))]
+            lines.append(f"{dbz}," + ",".join("#{:02x}{:02x}{:02x}{:02x}".format(*color) for color in colors))
+        return "\n".join(lines).encode("utf-8")
+
+    @staticmethod
+    def getTile(timestamp: int, tile_size: int, zoom: int, x: int, y: int, scheme: int) -> bytes:
+        """
+        A made up rain field that drifts from frame to frame and lines up across tile edges.
+        It is measured in tiles, so every zoom has some weather in view. Worked out on 8px blocks to keep it quick.
+        """
+        block = 8
+        phase = timestamp / FRAME_SECS * 0.15
+        colors = {}
+        rows = []
+        for block_y in range(tile_size // block):
+            v = y + (block_y + 0.5) * block / tile_size
+            row = bytearray()
+            for block_x in range(tile_size // block):
+                u = x + (block_x + 0.5) * block / tile_size
+                field = 0.6 * math.sin(u * 1.7 + phase) * math.cos(v * 1.3 - phase * 0.7) + 0.4 * math.sin((u + v) * 2.9 + phase * 1.3)
+                dbz = int(field * 70) - 10
+                if dbz < 5:
+                    row += b"\x00\x00\x00\x00" * block
+                    continue
+                dbz = min(dbz, 75)
+                if dbz not in colors:
+                    colors[dbz] = bytes(StandInUtils.getSchemeColor(scheme, dbz))
+                row += colors[dbz] * block
+            rows += [bytes(row)] * block
+        return StandInUtils.getPng(tile_size, tile_size, rows)
+
+    @staticmethod
+    def getMap(width: int, height: int) -> bytes:
+        # Dark land with a lighter grid every 64px, enough to see the radar lines up.
+        land = b"\x28\x38\x28\xff"
+        grid = b"\x50\x60\x50\xff"
+        row = b"".join(grid if x % 64 == 0 else land for x in range(width))
+        grid_row = grid * width
+        return StandInUtils.getPng(width, height, [grid_row if y % 64 == 0 else row for y in range(height)])
+
+    @staticmethod
+    def shiftTimes(json_obj, offset: int):
+        # Every "dt" moves by the same amount, so a recorded forecast always starts now.
+        if isinstance(json_obj, dict):
+            for name, value in json_obj.items():
+                if name == "dt" and isinstance(value, int):
+                    json_obj[name] = value + offset
+                else:
+                    StandInUtils.shiftTimes(value, offset)
+        elif isinstance(json_obj, list):
+            for value in json_obj:
+                StandInUtils.shiftTimes(value, offset)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    A local stand-in for every server WxClock talks to, so the fetch pipelines can be measured and soaked with no network.
+    Point base_urls at it (see ConfigExample.py) and it answers manifests, radar tiles, the color table, static maps and forecasts.
+    Anything in the fixture folder gets replayed, with its times moved up to now. Anything else gets made up on the spot,
+    or with --record, fetched from the real server and saved as a fixture for next time.
+    Latency, bandwidth, errors and stalls can all be injected, seeded so the same run goes the same way twice.
+    """
+    daemon_threads = True
+
+    def __init__(self, settings: StandInSettings):
+        super().__init__(("127.0.0.1", settings.port), StandInHandler)
+        self.settings = settings
+        self.base_url = f"http://127.0.0.1:{settings.port}"
+        self.random = random.Random(settings.seed)
+        self.lock = threading.Lock()
+        self.tiles = OrderedDict()
+        self.counts = {}
+
+        # Recorded frames get moved up to now, this is how far, and the tiles are looked up by their recorded time.
+        self.time_offset = 0
+        self.recorded_host = ""
+
+    def count(self, name: str):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def roll(self, rate: float) -> bool:
+        if rate <= 0.0:
+            return False
+        with self.lock:
+            return self.random.random() < rate
+
+    def getFixture(self, name: str) -> bytes | None:
+        fixture_file = os.path.join(self.settings.fixture_dir, name)
+        if not os.path.exists(fixture_file):
+            return None
+        with open(fixture_file, "rb") as file:
+            return file.read()
+
+    def putFixture(self, name: str, body: bytes):
+        fixture_file = os.path.join(self.settings.fixture_dir, name)
+        os.makedirs(os.path.dirname(fixture_file), exist_ok = True)
+        with open(fixture_file, "wb") as file:
+            file.write(body)
+
+    def fetch(self, url: str) -> bytes | None:
+        try:
+            with urllib.request.urlopen(url, timeout = 30) as response:
+                return response.read()
+        except (urllib.error.URLError, TimeoutError) as error:
+            print(f"StandInServer.fetch(): {error} for {url}")
+            return None
+
+    def getManifest(self, path: str) -> bytes:
+        newest = int(time.time()) // FRAME_SECS * FRAME_SECS
+        name = os.path.join("manifest", "weather-maps.json")
+        body = self.getFixture(name)
+        if body is None and self.settings.record:
+            body = self.fetch(UPSTREAM_URLS["manifest"] + path)
+            if body is not None:
+                self.putFixture(name, body)
+
+        if body is None:
+            past = [{"time": newest - FRAME_SECS * i, "path": f"/v2/radar/{newest - FRAME_SECS * i}"} for i in range(FRAME_COUNT - 1, -1, -1)]
+            json_obj = {"version": "2.0", "generated": newest, "host": self.base_url, "radar": {"past": past, "nowcast": []}}
+        else:
+            json_obj = json.loads(body)
+            self.recorded_host = json_obj["host"]
+            self.time_offset = newest - json_obj["radar"]["past"][-1]["time"]
+            for item in json_obj["radar"]["past"]:
+                item["path"] = item["path"].replace(str(item["time"]), str(item["time"] + self.time_offset))
+                item["time"] += self.time_offset
+            json_obj["generated"] = newest
+            json_obj["host"] = self.base_url
+        return json.dumps(json_obj).encode("utf-8")
+
+    def getTile(self, path: str) -> bytes | None:
+        # /v2/radar/{timestamp}/{size}/{zoom}/{x}/{y}/{color}/{smooth}_{snow}.png
+        parts = path.strip("/").split("/")
+        if len(parts) < 9:
+            return None
+        timestamp, tile_size, zoom, x, y, scheme = (int(part) for part in parts[2:8])
+        recorded_path = path.replace(parts[2], str(timestamp - self.time_offset), 1)
+        name = StandInUtils.getFixtureName("tile", recorded_path, "")
+        body = self.getFixture(name)
+        if body is None and self.settings.record and self.recorded_host != "":
+            body = self.fetch(self.recorded_host + recorded_path)
+            if body is not None:
+                self.putFixture(name, body)
+        if body is not None:
+            return body
+
+        # Made up tiles take a moment, and every radar asks for the same ones.
+        key = (timestamp, tile_size, zoom, x, y, scheme)
+        with self.lock:
+            body = self.tiles.get(key)
+        if body is None:
+            body = StandInUtils.getTile(timestamp, tile_size, zoom, x, y, scheme)
+            with self.lock:
+                self.tiles[key] = body
+                while len(self.tiles) > 2000:
+                    self.tiles.popitem(last = False)
+        return body
+
+    def getOther(self, kind: str, path: str, query: str) -> bytes | None:
+        name = StandInUtils.getFixtureName(kind, path, query)
+        body = self.getFixture(name)
+        if body is None and kind == "weather":
+            # One forecast and one current conditions fixture stand in for every location.
+            body = self.getFixture(os.path.join(kind, os.path.basename(path) + ".json"))
+        if body is None and self.settings.record:
+            body = self.fetch(UPSTREAM_URLS[kind] + path + ("?" + query if query else ""))
+            if body is not None:
+                self.putFixture(name, body)
+
+        if kind == "colors" and body is None:
+            body = StandInUtils.getColorTable()
+        elif kind == "map" and body is None:
+            params = dict(parse_qsl(query))
+            width, height = (int(part) for part in params.get("size", "640x640").split("x"))
+            body = StandInUtils.getMap(width, height)
+        elif kind == "weather" and body is not None:
+            json_obj = json.loads(body)
+            now = int(time.time())
+            if "list" in json_obj and len(json_obj["list"]) > 0:
+                # Forecasts are every 3 hours, starting at the next 3 hour mark.
+                first = (now // (3 * 60 * 60) + 1) * 3 * 60 * 60
+                StandInUtils.shiftTimes(json_obj, first - json_obj["list"][0]["dt"])
+            elif "dt" in json_obj:
+                StandInUtils.shiftTimes(json_obj, now - json_obj["dt"])
+            body = json.dumps(json_obj).encode("utf-8")
+        return body
+
+    def getResponse(self, path: str, query: str) -> tuple[int, str, bytes]:
+        kind = StandInUtils.getKind(path)
+        self.count(kind or "unknown")
+        if kind == "manifest":
+            return 200, "application/json", self.getManifest(path)
+
+        body = None
+        if kind == "tile":
+            body = self.getTile(path)
+        elif kind != "":
+            body = self.getOther(kind, path, query)
+
+        if body is None:
+            return 404, "text/plain", b"No fixture"
+        content_types = {"tile": "image/png", "map": "image/png", "colors": "text/csv", "weather": "application/json"}
+        return 200, content_types[kind], body
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        settings = server.settings
+        url = urlsplit(self.path)
+        if url.path == "/stats":
+            self.send(200, "application/json", json.dumps(server.counts).encode("utf-8"))
+            return
+
+        if settings.latency_ms > 0:
+            time.sleep(settings.latency_ms / 1000)
+        if server.roll(settings.stall_rate):
+            server.count("stalled")
+            time.sleep(settings.stall_secs)
+        if server.roll(settings.error_rate):
+            server.count("errors")
+            self.send(503, "text/plain", b"Injected error")
+            return
+
+        status, content_type, body = server.getResponse(url.path, url.query)
+        self.send(status, content_type, body)
+
+    def send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        # Bandwidth is held per connection, in 4KB writes.
+        bandwidth_kbps = self.server.settings.bandwidth_kbps
+        if bandwidth_kbps <= 0:
+            self.wfile.write(body)
+            return
+        for start in range(0, len(body), 4096):
+            self.wfile.write(body[start:start + 4096])
+            time.sleep(4 / bandwidth_kbps)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Local stand-in for the weather, radar and map servers.")
+    parser.add_argument("--port", type = int, default = 8765)
+    parser.add_argument("--fixtures", default = FIXTURE_DIR)
+    parser.add_argument("--record", action = "store_true")
+    parser.add_argument("--latency", type = int, default = 0, help = "ms before every answer")
+    parser.add_argument("--bandwidth", type = int, default = 0, help = "KB a second per connection, 0 for unlimited")
+    parser.add_argument("--error-rate", type = float, default = 0.0)
+    parser.add_argument("--stall-rate", type = float, default = 0.0)
+    parser.add_argument("--stall-secs", type = int, default = 60)
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+
+    stand_in = StandInServer(StandInSettings(
+        args.port,
+        args.fixtures,
+        args.record,
+        args.latency,
+        args.bandwidth,
+        args.error_rate,
+        args.stall_rate,
+        args.stall_secs,
+        args.seed
+    ))
+    print(f"StandInServer: serving {args.fixtures} on {stand_in.base_url}")
+    stand_in.serve_forever()
\ No newline at end of file
@@ -0,0 +1,163 @@
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from PyQt6.QtCore import Qt, QTimer
+
+from MetricsUtils import Metrics
+
+# Anything due within this long after the first thing due gets run on the same wakeup, a little late.
+COALESCE_MS = 5
+
+
+class Tick:
+    SECOND = "second"
+    MINUTE = "minute"
+    DAY = "day"
+
+
+class AnimationSlot:
+    """
+    Calls on_frame fps times a second, on frame boundaries counted from the top of each wall clock second.
+    Get one from TickScheduler.addAnimation().
+    """
+    def __init__(self, scheduler, fps: int, on_frame: Callable[[], None]):
+        self.scheduler = scheduler
+        self.fps = fps
+        self.on_frame = on_frame
+        self.next_frame = self.getNextFrame(time.time())
+
+    def getNextFrame(self, now: float) -> float:
+        # The next frame boundary after now. If we're running late, the nearest boundary counts as the one we're on.
+        interval = 1.0 / self.fps
+        second = math.floor(now)
+        return second + (math.floor((now - second) / interval + 0.5) + 1) * interval
+
+    def setFps(self, fps: int):
+        self.fps = fps
+        self.next_frame = self.getNextFrame(time.time())
+        self.scheduler.schedule()
+
+    def stop(self):
+        self.scheduler.removeAnimation(self)
+
+
+class TickScheduler:
+    """
+    One timer for everything that happens on the wall clock's seconds, minutes and days, and for animations.
+    The timer is aimed at whatever is due next, and everything due within COALESCE_MS of it runs on the same wakeup,
+    so widgets ticking on the same second wake us once instead of each drifting along on their own QTimer.
+    Ticks fire just after their boundary, never before, and fire whenever the wall clock has moved on to a new
+    second, minute or day since last time, so a late wakeup or the clock getting set doesn't lose one.
+    """
+    instance = None
+
+    @staticmethod
+    def getScheduler():
+        if TickScheduler.instance is None:
+            TickScheduler.instance = TickScheduler()
+        return TickScheduler.instance
+
+    def __init__(self):
+        self.subscribers = {
+            Tick.SECOND: [],
+            Tick.MINUTE: [],
+            Tick.DAY: [],
+        }
+        self.animations = []
+        # The second, minute or day each tick last fired for.
+        self.last_keys = {}
+        self.target = 0.0
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.wake)
+
+    def subscribe(self, tick: str, callback: Callable[[], None]):
+        # The first tick is at the next boundary, callers draw themselves once up front if they need to.
+        if len(self.subscribers[tick]) == 0:
+            self.last_keys[tick] = TickScheduler.getKeys(time.time())[tick]
+        self.subscribers[tick].append(callback)
+        self.schedule()
+
+    def unsubscribe(self, tick: str, callback: Callable[[], None]):
+        if callback in self.subscribers[tick]:
+            self.subscribers[tick].remove(callback)
+        self.schedule()
+
+    def addAnimation(self, fps: int, on_frame: Callable[[], None]) -> AnimationSlot:
+        slot = AnimationSlot(self, fps, on_frame)
+        self.animations.append(slot)
+        self.schedule()
+        return slot
+
+    def removeAnimation(self, slot: AnimationSlot):
+        if slot in self.animations:
+            self.animations.remove(slot)
+        self.schedule()
+
+    @staticmethod
+    def getKeys(now: float) -> dict:
+        return {
+            Tick.DAY: datetime.fromtimestamp(now).date(),
+            Tick.MINUTE: int(now // 60),
+            Tick.SECOND: int(now),
+        }
+
+    @staticmethod
+    def getNextBoundary(tick: str, now: float) -> float:
+        if tick == Tick.SECOND:
+            return math.floor(now) + 1
+        if tick == Tick.MINUTE:
+            return (math.floor(now / 60) + 1) * 60
+
+        # Local midnight, which isn't a fixed distance away once daylight saving gets involved.
+        tomorrow = datetime.combine(datetime.fromtimestamp(now).date() + timedelta(days = 1), datetime.min.time())
+        return max(now + 1, tomorrow.timestamp())
+
+    def wake(self):
+        now = time.time()
+        # Callbacks can reschedule us, so hang on to what this wakeup was aimed at.
+        target = self.target
+        Metrics.increment("tick.wakeups")
+        dispatches = 0
+
+        # Days first, so anyone watching seconds too sees the new date already set up.
+        keys = TickScheduler.getKeys(now)
+        for tick in (Tick.DAY, Tick.MINUTE, Tick.SECOND):
+            if keys[tick] == self.last_keys.get(tick):
+                continue
+            self.last_keys[tick] = keys[tick]
+            for callback in list(self.subscribers[tick]):
+                callback()
+                dispatches += 1
+
+        for slot in list(self.animations):
+            if slot.next_frame <= now:
+                slot.next_frame = slot.getNextFrame(now)
+                slot.on_frame()
+                dispatches += 1
+
+        if dispatches > 0:
+            Metrics.increment("tick.dispatches", dispatches)
+            Metrics.recordTiming("tick.jitter", (now - target) * 1000)
+        self.schedule()
+
+    def schedule(self):
+        now = time.time()
+        due_times = [TickScheduler.getNextBoundary(tick, now) for tick, callbacks in self.subscribers.items() if len(callbacks) > 0]
+        for slot in self.animations:
+            # The clock got set back, so this frame is further off than getNextFrame() ever puts one.
+            if slot.next_frame > now + 2.0 / slot.fps:
+                slot.next_frame = slot.getNextFrame(now)
+            due_times.append(slot.next_frame)
+
+        if len(due_times) == 0:
+            self.timer.stop()
+            return
+
+        # Aim at the last thing due within COALESCE_MS of the first, so they all go on one wakeup.
+        first = min(due_times)
+        self.target = max(due for due in due_times if due <= first + COALESCE_MS / 1000)
+        self.timer.start(max(0, math.ceil((self.target - now) * 1000)))
@@ -6,7 +6,8 @@ from PyQt6.QtGui import QCursor
 from PyQt6.QtWidgets import QApplication
 
 import Config
-from assets.AssetUtils import AssetUtils
+from NetworkUtils import NetworkService
+from assets.CacheManager import CacheManager
 
 from widgets.MainWindow import MainWindow
 
@@ -27,7 +28,11 @@ config.configureBackground(
     backgound_file
 )
 
-AssetUtils.clearRadarCache()
+# Bring the cache index up to date and hold the caches to their budgets from here on.
+CacheManager.getManager().start(config.wx_settings)
+
+# Any servers we were pointed somewhere else, like a local stand-in.
+NetworkService.getService().setBaseUrls(config.wx_settings.base_urls)
 
 # Create a main window.
 main_window = MainWindow(config)
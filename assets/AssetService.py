@@ -0,0 +1,131 @@
+import os
+from collections import OrderedDict
+
+from PyQt6.QtCore import QSize, Qt
+from PyQt6.QtGui import QImage, QPainter, QPixmap
+
+from MetricsUtils import Metrics
+from assets.AssetUtils import AssetUtils
+from assets.CacheManager import CacheManager
+
+# QtSvg is its own package on some distros, so SVG sources only get used when it's installed.
+try:
+    from PyQt6.QtSvg import QSvgRenderer
+except ImportError:
+    QSvgRenderer = None
+
+# Renditions we keep around in memory, the least recently used go first.
+MEMORY_BUDGET_MB = 32
+
+# Reading a rendition back from a PNG isn't free, a 700px one takes about 12ms to decode,
+# so only renditions that took longer than that to make get written to disk.
+DISK_CACHE_RENDER_MS = 15
+
+
+class Rendition:
+    def __init__(self, image: QImage):
+        self.image = image
+        self.pixmap = None
+
+    def getBytes(self) -> int:
+        # The pixmap is a second copy of the pixels.
+        return self.image.sizeInBytes() * (1 if self.pixmap is None else 2)
+
+
+class AssetService:
+    """
+    Hands out our images at whatever size they're needed, always made straight from the pristine source,
+    so nothing ever gets scaled twice.
+    Each (color folder, asset, size) gets made once, after that it's a lookup in memory,
+    and slow ones come back from the disk cache after a restart.
+    Assets are named relative to their color folder without an extension, like "clock_face" or "icons/rain".
+    """
+    instance = None
+
+    @staticmethod
+    def getService():
+        if AssetService.instance is None:
+            AssetService.instance = AssetService(MEMORY_BUDGET_MB)
+        return AssetService.instance
+
+    def __init__(self, memory_budget_mb: int):
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+        self.memory_bytes = 0
+        # Source file to its decoded QImage or QSvgRenderer, only loaded when a rendition needs making.
+        self.sources = {}
+        self.renditions = OrderedDict()
+
+    def getImage(self, assets_color: str, asset_name: str, size: QSize) -> QImage:
+        # Always ARGB32_Premultiplied, so it can go straight into painting or rotating.
+        return self.getRendition(assets_color, asset_name, size).image
+
+    def getPixmap(self, assets_color: str, asset_name: str, size: QSize) -> QPixmap:
+        rendition = self.getRendition(assets_color, asset_name, size)
+        if rendition.pixmap is None:
+            self.memory_bytes -= rendition.getBytes()
+            rendition.pixmap = QPixmap.fromImage(rendition.image)
+            self.memory_bytes += rendition.getBytes()
+        return rendition.pixmap
+
+    def getRendition(self, assets_color: str, asset_name: str, size: QSize) -> Rendition:
+        if size.isEmpty():
+            return Rendition(QImage())
+
+        key = (assets_color, asset_name, size.width(), size.height())
+        rendition = self.renditions.get(key)
+        if rendition is not None:
+            self.renditions.move_to_end(key)
+            Metrics.increment("assets.memory_hits")
+            return rendition
+
+        rendition = Rendition(self.makeImage(assets_color, asset_name, size))
+        self.renditions[key] = rendition
+        self.memory_bytes += rendition.getBytes()
+        while self.memory_bytes > self.memory_budget_bytes and len(self.renditions) > 1:
+            _, evicted = self.renditions.popitem(last = False)
+            self.memory_bytes -= evicted.getBytes()
+        Metrics.setGauge("assets.memory_bytes", self.memory_bytes)
+        return rendition
+
+    def makeImage(self, assets_color: str, asset_name: str, size: QSize) -> QImage:
+        source_file = AssetUtils.getAssetSourceFile(assets_color, asset_name, QSvgRenderer is not None)
+        if source_file is None:
+            print(f"AssetService.makeImage(): No source for {assets_color}/{asset_name}")
+            return QImage()
+
+        cached_file = AssetUtils.getCachedRenditionFile(assets_color, asset_name, int(os.path.getmtime(source_file)), size)
+        if CacheManager.getManager().has(cached_file):
+            image = QImage(cached_file)
+            if not image.isNull():
+                Metrics.increment("assets.disk_hits")
+                return image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+
+        source = self.getSource(source_file)
+        render_start = Metrics.now()
+        if isinstance(source, QImage):
+            image = source.scaled(size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        else:
+            image = QImage(source.defaultSize().scaled(size, Qt.AspectRatioMode.KeepAspectRatio), QImage.Format.Format_ARGB32_Premultiplied)
+            image.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(image)
+            source.render(painter)
+            painter.end()
+        render_ms = Metrics.elapsedMs(render_start)
+        Metrics.recordTiming("assets.render", render_ms)
+
+        if render_ms > DISK_CACHE_RENDER_MS and image.save(cached_file):
+            CacheManager.getManager().add(cached_file, source_file)
+        return image
+
+    def getSource(self, source_file: str):
+        source = self.sources.get(source_file)
+        if source is None:
+            load_start = Metrics.now()
+            if source_file.endswith(".svg"):
+                source = QSvgRenderer(source_file)
+            else:
+                # Scaling premultiplied pixels keeps dark fringes off the edges.
+                source = QImage(source_file).convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+            self.sources[source_file] = source
+            Metrics.recordTiming("assets.load", Metrics.elapsedMs(load_start))
+        return source
@@ -1,14 +1,18 @@
 import os
-from datetime import datetime, timedelta
 
 from PyQt6.QtCore import QSize
 
 ASSETS_DIR = ""
 BACKGROUNDS_DIR = "backgrounds"
+CACHE_INDEX_FILE = "cache_index.sqlite"
 ICONS_DIR = "icons"
 MAP_CACHE_DIR = "map_cache"
 MARKERS_DIR = "markers"
+MARKER_CACHE_DIR = "marker_cache"
 RADAR_CACHE_DIR = "radar_cache"
+RADAR_COLOR_TABLE_FILE = "radar_color_table.csv"
+RADAR_TILE_CACHE_DIR = "radar_tile_cache"
+RENDITION_CACHE_DIR = "rendition_cache"
 
 
 class Icons:
@@ -24,11 +28,40 @@ class Icons:
     THUNDERSTORM = "thunderstorm"
     WIND = "wind"
 
+class ClockAssets:
+    FACE = "clock_face"
+    HOUR_HAND = "hour_hand"
+    MINUTE_HAND = "min_hand"
+    SECOND_HAND = "sec_hand"
+
 class AssetUtils:
+    # Folders we have already made sure exist, so building a file name doesn't have to hit the disk.
+    created_paths = set()
+
     @staticmethod
     def getAssetsPath():
         return os.path.join(os.path.dirname(__file__), ASSETS_DIR)
 
+    @staticmethod
+    def ensurePath(path: str):
+        if path not in AssetUtils.created_paths:
+            os.makedirs(path, exist_ok = True)
+            AssetUtils.created_paths.add(path)
+        return path
+
+    @staticmethod
+    def getCachePath(cache_dir: str):
+        return AssetUtils.ensurePath(os.path.join(AssetUtils.getAssetsPath(), cache_dir))
+
+    @staticmethod
+    def getCacheIndexFile():
+        return os.path.join(AssetUtils.getAssetsPath(), CACHE_INDEX_FILE)
+
+    @staticmethod
+    def getRadarColorTableFile():
+        # Not in a cache folder, it only changes when RainViewer adds a scheme, so it never gets evicted.
+        return os.path.join(AssetUtils.getAssetsPath(), RADAR_COLOR_TABLE_FILE)
+
     @staticmethod
     def getBackgroundsPath():
         return os.path.join(AssetUtils.getAssetsPath(), BACKGROUNDS_DIR)
@@ -39,10 +72,7 @@ class AssetUtils:
 
     @staticmethod
     def getMapCachePath():
-        path = os.path.join(AssetUtils.getAssetsPath(), MAP_CACHE_DIR)
-        if not os.path.exists(path):
-            os.makedirs(path)
-        return path
+        return AssetUtils.getCachePath(MAP_CACHE_DIR)
 
     @staticmethod
     def getCachedMapFile(
@@ -57,10 +87,7 @@ class AssetUtils:
 
     @staticmethod
     def getMarkersPath():
-        path = os.path.join(AssetUtils.getAssetsPath(), MARKERS_DIR)
-        if not os.path.exists(path):
-            os.makedirs(path)
-        return path
+        return AssetUtils.ensurePath(os.path.join(AssetUtils.getAssetsPath(), MARKERS_DIR))
 
     @staticmethod
     def getMarkerFile(name: str):
@@ -68,12 +95,19 @@ class AssetUtils:
         file_name = f"{name}.png"
         return os.path.join(base_path, file_name)
 
+    @staticmethod
+    def getMarkerCachePath():
+        return AssetUtils.getCachePath(MARKER_CACHE_DIR)
+
+    @staticmethod
+    def getCachedMarkerFile(name: str, color_hex: str, size: int):
+        base_path = AssetUtils.getMarkerCachePath()
+        file_name = f"{name}_{color_hex}_{size}.png"
+        return os.path.join(base_path, file_name)
+
     @staticmethod
     def getRadarCachePath():
-        path = os.path.join(AssetUtils.getAssetsPath(), RADAR_CACHE_DIR)
-        if not os.path.exists(path):
-            os.makedirs(path)
-        return path
+        return AssetUtils.getCachePath(RADAR_CACHE_DIR)
 
     @staticmethod
     def getCachedRadarFile(
@@ -88,25 +122,54 @@ class AssetUtils:
         return os.path.join(base_path, file_name)
 
     @staticmethod
-    def clearRadarCache():
-        cache_path = AssetUtils.getRadarCachePath()
-        if os.path.exists(cache_path):
-            now = datetime.now()
-            for file_name in os.listdir(cache_path):
-                file_name_parts = file_name.split("_")
-                file_time = datetime.fromtimestamp(int(file_name_parts[0]))
-                # We can delete anything that is older than 2 hours.
-                if file_time + timedelta(hours = 2) < now:
-                    os.remove(os.path.join(cache_path, file_name))
+    def getRadarFrameStoreFile(
+            latitude: float,
+            longitude: float,
+            zoom: int,
+            size: QSize,
+            color_name: str,
+            tile_size: int
+    ):
+        base_path = AssetUtils.getRadarCachePath()
+        file_name = f"{latitude}_{longitude}_{zoom}_{size.width()}x{size.height()}_{color_name}_{tile_size}.frames"
+        return os.path.join(base_path, file_name)
+
+    @staticmethod
+    def getRadarTileCachePath():
+        return AssetUtils.getCachePath(RADAR_TILE_CACHE_DIR)
+
+    @staticmethod
+    def getCachedRadarTileFile(key_name: str):
+        base_path = AssetUtils.getRadarTileCachePath()
+        file_name = f"{key_name}.png"
+        return os.path.join(base_path, file_name)
 
     @staticmethod
     def getColorPath(assets_color):
         return os.path.join(AssetUtils.getAssetsPath(), assets_color)
 
     @staticmethod
-    def getIconsPath(assets_color):
-        return os.path.join(AssetUtils.getColorPath(assets_color), ICONS_DIR)
+    def getIconAsset(icon):
+        # Asset names are relative to the color folder, and have no extension.
+        return f"{ICONS_DIR}/{icon}"
+
+    @staticmethod
+    def getAssetSourceFile(assets_color, asset_name, use_svg: bool):
+        # An SVG wins over a PNG of the same name, when we can render it.
+        base_file = os.path.join(AssetUtils.getColorPath(assets_color), asset_name)
+        extensions = [".svg", ".png"] if use_svg else [".png"]
+        for extension in extensions:
+            if os.path.exists(base_file + extension):
+                return base_file + extension
+        return None
+
+    @staticmethod
+    def getRenditionCachePath():
+        return AssetUtils.getCachePath(RENDITION_CACHE_DIR)
 
     @staticmethod
-    def getIcon(assets_color, icon):
-        return os.path.join(AssetUtils.getIconsPath(assets_color), icon)
\ No newline at end of file
+    def getCachedRenditionFile(assets_color, asset_name, modified: int, size: QSize):
+        # The source's modified time is in the name, so editing an asset doesn't leave us showing the old one.
+        base_path = AssetUtils.getRenditionCachePath()
+        file_name = f"{assets_color}_{asset_name.replace('/', '_')}_{modified}_{size.width()}x{size.height()}.png"
+        return os.path.join(base_path, file_name)
\ No newline at end of file
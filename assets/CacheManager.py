@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import time
+
+from PyQt6.QtCore import QTimer
+
+from MetricsUtils import Metrics
+from assets.AssetUtils import AssetUtils, MAP_CACHE_DIR, MARKER_CACHE_DIR, RADAR_CACHE_DIR, RADAR_TILE_CACHE_DIR, RENDITION_CACHE_DIR
+from configs.ConfigUtils import WxSettings
+
+
+class CacheBudget:
+    def __init__(self, max_bytes: int, max_age_seconds: int):
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+
+class CacheManager:
+    """
+    Keeps an SQLite index of every file in our caches: its size, when it was made, when it was last used and where it came from.
+    Lookups are answered from the index instead of probing the disk,
+    and evict() holds each cache to its byte and age budgets, dropping the least recently used files first.
+    Files are named by their full path, and the cache they belong to is the folder they are in.
+    """
+    instance = None
+
+    @staticmethod
+    def getManager():
+        if CacheManager.instance is None:
+            CacheManager.instance = CacheManager(AssetUtils.getCacheIndexFile())
+        return CacheManager.instance
+
+    def __init__(self, index_file: str):
+        self.budgets = {
+            MAP_CACHE_DIR: CacheBudget(50 * 1024 * 1024, 90 * 24 * 60 * 60),
+            MARKER_CACHE_DIR: CacheBudget(5 * 1024 * 1024, 365 * 24 * 60 * 60),
+            RADAR_CACHE_DIR: CacheBudget(100 * 1024 * 1024, 2 * 60 * 60),
+            RADAR_TILE_CACHE_DIR: CacheBudget(100 * 1024 * 1024, 2 * 60 * 60),
+            RENDITION_CACHE_DIR: CacheBudget(20 * 1024 * 1024, 365 * 24 * 60 * 60),
+        }
+        # Writes are only committed when we evict, so a lookup never waits on the SD card.
+        self.connection = sqlite3.connect(index_file)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS cache_files (
+                cache TEXT NOT NULL,
+                name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL,
+                origin TEXT NOT NULL,
+                PRIMARY KEY (cache, name)
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS cache_files_lru ON cache_files (cache, last_access)")
+        self.connection.commit()
+        self.evict_timer = QTimer()
+        self.evict_timer.timeout.connect(self.evict)
+
+    def start(self, wx_settings: WxSettings):
+        # Reconcile with the disk once, evict once, then keep evicting on a schedule.
+        self.configure(wx_settings)
+        self.rebuild()
+        self.evict()
+        self.evict_timer.start(wx_settings.cache_evict_minutes * 60 * 1000)
+
+    def configure(self, wx_settings: WxSettings):
+        self.budgets[MAP_CACHE_DIR] = CacheBudget(wx_settings.map_cache_mb * 1024 * 1024, wx_settings.map_cache_days * 24 * 60 * 60)
+        radar_budget = CacheBudget(wx_settings.radar_cache_mb * 1024 * 1024, wx_settings.radar_cache_hours * 60 * 60)
+        self.budgets[RADAR_CACHE_DIR] = radar_budget
+        self.budgets[RADAR_TILE_CACHE_DIR] = radar_budget
+
+    @staticmethod
+    def splitPath(file_path: str) -> tuple[str, str]:
+        folder, name = os.path.split(file_path)
+        return os.path.basename(folder), name
+
+    def has(self, file_path: str) -> bool:
+        # A lookup counts as a use, so it keeps the file at the fresh end of the LRU.
+        return self.touch(file_path)
+
+    def touch(self, file_path: str) -> bool:
+        # For files we keep open and use in place, which never get looked up again, so they don't age out from under us.
+        cache, name = CacheManager.splitPath(file_path)
+        cursor = self.connection.execute(
+            "UPDATE cache_files SET last_access = ? WHERE cache = ? AND name = ?",
+            (time.time(), cache, name)
+        )
+        return cursor.rowcount > 0
+
+    def add(self, file_path: str, origin: str):
+        # Call this after the file has been written.
+        cache, name = CacheManager.splitPath(file_path)
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            return
+        now = time.time()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO cache_files (cache, name, size, created, last_access, origin) VALUES (?, ?, ?, ?, ?, ?)",
+            (cache, name, size, now, now, origin)
+        )
+
+    def remove(self, file_path: str):
+        cache, name = CacheManager.splitPath(file_path)
+        cursor = self.connection.execute("DELETE FROM cache_files WHERE cache = ? AND name = ?", (cache, name))
+        if cursor.rowcount > 0:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+    def rebuild(self):
+        """
+        Brings the index in line with what is actually on disk.
+        Only needed at startup, in case files were added or removed while we weren't running.
+        """
+        for cache in self.budgets.keys():
+            cache_path = AssetUtils.getCachePath(cache)
+            disk_names = set(os.listdir(cache_path))
+            index_names = set(row[0] for row in self.connection.execute("SELECT name FROM cache_files WHERE cache = ?", (cache,)))
+
+            for name in index_names - disk_names:
+                self.connection.execute("DELETE FROM cache_files WHERE cache = ? AND name = ?", (cache, name))
+
+            for name in disk_names - index_names:
+                file_stat = os.stat(os.path.join(cache_path, name))
+                self.connection.execute(
+                    "INSERT INTO cache_files (cache, name, size, created, last_access, origin) VALUES (?, ?, ?, ?, ?, ?)",
+                    (cache, name, file_stat.st_size, file_stat.st_mtime, file_stat.st_mtime, "unknown")
+                )
+
+        self.connection.commit()
+
+    def evict(self):
+        evict_start = Metrics.now()
+        now = time.time()
+        evicted_count = 0
+        for cache, budget in self.budgets.items():
+            cache_path = AssetUtils.getCachePath(cache)
+
+            # Anything that hasn't been used within the age budget goes.
+            stale_names = [row[0] for row in self.connection.execute(
+                "SELECT name FROM cache_files WHERE cache = ? AND last_access < ?",
+                (cache, now - budget.max_age_seconds)
+            )]
+
+            # Then the least recently used files go until we fit in the byte budget.
+            total_bytes = self.connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM cache_files WHERE cache = ? AND last_access >= ?",
+                (cache, now - budget.max_age_seconds)
+            ).fetchone()[0]
+            if total_bytes > budget.max_bytes:
+                for name, size in self.connection.execute(
+                        "SELECT name, size FROM cache_files WHERE cache = ? AND last_access >= ? ORDER BY last_access",
+                        (cache, now - budget.max_age_seconds)
+                ).fetchall():
+                    if total_bytes <= budget.max_bytes:
+                        break
+                    stale_names.append(name)
+                    total_bytes -= size
+
+            for name in stale_names:
+                self.remove(os.path.join(cache_path, name))
+            evicted_count += len(stale_names)
+
+            Metrics.setGauge(f"cache.{cache}.bytes", self.getCacheBytes(cache))
+
+        self.connection.commit()
+        Metrics.increment("cache.evicted", evicted_count)
+        Metrics.recordTiming("cache.evict", Metrics.elapsedMs(evict_start))
+
+    def getCacheBytes(self, cache: str) -> int:
+        return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM cache_files WHERE cache = ?", (cache,)).fetchone()[0]
+
+    def close(self):
+        self.evict_timer.stop()
+        self.connection.commit()
+        self.connection.close()
@@ -0,0 +1,160 @@
+from PyQt6.QtCore import QObject, QPoint, QRunnable, QThreadPool, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap, QTransform
+
+from MetricsUtils import Metrics
+from assets.AssetUtils import ClockAssets
+from assets.ImageUtils import ImageUtils
+
+
+class Hand:
+    SECOND = "second"
+    MINUTE = "minute"
+    HOUR = "hour"
+
+
+HAND_ASSETS = {
+    Hand.SECOND: ClockAssets.SECOND_HAND,
+    Hand.MINUTE: ClockAssets.MINUTE_HAND,
+    Hand.HOUR: ClockAssets.HOUR_HAND,
+}
+
+# How many places each hand can point, the hour hand moves every minute.
+HAND_POSITIONS = {
+    Hand.SECOND: 60,
+    Hand.MINUTE: 60,
+    Hand.HOUR: 12 * 60,
+}
+
+
+class ClockHandUtils:
+    @staticmethod
+    def getPositionCount(hand: str, sweep_fps: int = 0) -> int:
+        # A sweeping second hand has a position for every frame, not just every second.
+        if hand == Hand.SECOND and sweep_fps > 0:
+            return HAND_POSITIONS[hand] * sweep_fps
+        return HAND_POSITIONS[hand]
+
+    @staticmethod
+    def getAngle(hand: str, position: int, sweep_fps: int = 0) -> float:
+        return position * 360.0 / ClockHandUtils.getPositionCount(hand, sweep_fps)
+
+    @staticmethod
+    def rotate(hand_image: QImage, hand: str, position: int) -> tuple[QImage, QPoint]:
+        """
+        QImages can be rotated off the GUI thread, QPixmaps can't.
+        A rotated hand is mostly empty corners, so it gets cropped down to the hand itself,
+        and comes back with where its top left goes, relative to the clock's center.
+        """
+        image = hand_image.transformed(
+            QTransform().rotate(ClockHandUtils.getAngle(hand, position)),
+            Qt.TransformationMode.SmoothTransformation
+        )
+        crop = ImageUtils.getOpaqueRect(image)
+        if crop.isEmpty():
+            return image, QPoint(-(image.width() // 2), -(image.height() // 2))
+        return image.copy(crop), QPoint(crop.x() - image.width() // 2, crop.y() - image.height() // 2)
+
+    @staticmethod
+    def getBuildOrder(positions: dict[str, int]) -> list[tuple[str, int]]:
+        # Seconds first since they change every tick, then minutes, then hours.
+        # Each hand starts where it points now, so the next few positions are ready soonest.
+        order = []
+        for hand in (Hand.SECOND, Hand.MINUTE, Hand.HOUR):
+            count = ClockHandUtils.getPositionCount(hand)
+            order += [(hand, (positions[hand] + step) % count) for step in range(count)]
+        return order
+
+
+class ClockHandSignals(QObject):
+    # QRunnables can't emit, so the job posts its rotated hands through this.
+    # It lives on the GUI thread, so the slot runs there.
+    rotated = pyqtSignal(int, object)
+
+
+class ClockHandJob(QRunnable):
+    """
+    Rotates every hand into every position it can point, on a QThreadPool thread.
+    Rotations go back in batches, and the job stops once it has used up the memory budget.
+    """
+    BATCH_SIZE = 30
+
+    def __init__(self, cache, generation: int, hand_images: dict[str, QImage], order: list[tuple[str, int]], budget_bytes: int):
+        super().__init__()
+        self.cache = cache
+        self.generation = generation
+        self.hand_images = hand_images
+        self.order = order
+        self.budget_bytes = budget_bytes
+        self.signals = cache.signals
+
+    def run(self):
+        job_start = Metrics.now()
+        used_bytes = 0
+        batch = []
+        for hand, position in self.order:
+            # We were resized again, so whatever we are making is the wrong size.
+            if self.cache.generation != self.generation:
+                return
+
+            image, offset = ClockHandUtils.rotate(self.hand_images[hand], hand, position)
+            used_bytes += image.sizeInBytes()
+            if used_bytes > self.budget_bytes:
+                break
+            batch.append((hand, position, image, offset))
+            if len(batch) >= ClockHandJob.BATCH_SIZE:
+                self.signals.rotated.emit(self.generation, batch)
+                batch = []
+
+        self.signals.rotated.emit(self.generation, batch)
+        Metrics.recordTiming("clock.hand_cache.build", Metrics.elapsedMs(job_start))
+
+
+class ClockHandCache:
+    """
+    Every position of every clock hand, rotated once per size so a tick only has to swap pixmaps.
+    The rotating happens on a pool thread after a resize, and anything it hasn't got to yet,
+    or that didn't fit in the memory budget, gets rotated on the spot like before.
+    A sweeping second hand has thousands of positions, so those get painted by AnalogClockCanvas instead.
+    """
+    def __init__(self, budget_mb: int):
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.generation = 0
+        self.hand_images = {}
+        self.pixmaps = {}
+        self.memory_bytes = 0
+        self.signals = ClockHandSignals()
+        self.signals.rotated.connect(self.onRotated)
+
+    def setHands(self, hand_images: dict[str, QImage], positions: dict[str, int]):
+        # New hand sizes, everything we had is the wrong size now.
+        self.generation += 1
+        self.hand_images = hand_images
+        self.pixmaps = {}
+        self.memory_bytes = 0
+        Metrics.setGauge("clock.hand_cache.bytes", 0)
+
+        if self.budget_bytes > 0:
+            order = ClockHandUtils.getBuildOrder(positions)
+            QThreadPool.globalInstance().start(ClockHandJob(self, self.generation, hand_images, order, self.budget_bytes))
+
+    def onRotated(self, generation: int, batch: list[tuple[str, int, QImage, QPoint]]):
+        if generation != self.generation:
+            return
+
+        for hand, position, image, offset in batch:
+            self.pixmaps[(hand, position)] = (QPixmap.fromImage(image), offset)
+            self.memory_bytes += image.sizeInBytes()
+        Metrics.setGauge("clock.hand_cache.bytes", self.memory_bytes)
+
+    def get(self, hand: str, position: int) -> tuple[QPixmap, QPoint]:
+        # The pixmap, and where its top left goes relative to the clock's center.
+        entry = self.pixmaps.get((hand, position))
+        if entry is not None:
+            Metrics.increment("clock.hand_cache.hits")
+            return entry
+
+        Metrics.increment("clock.hand_cache.misses")
+        rotate_start = Metrics.now()
+        image, offset = ClockHandUtils.rotate(self.hand_images[hand], hand, position)
+        Metrics.recordTiming("clock.rotate", Metrics.elapsedMs(rotate_start))
+        return QPixmap.fromImage(image), offset
\ No newline at end of file
@@ -0,0 +1,69 @@
+import numpy
+
+from PyQt6.QtCore import QRect
+from PyQt6.QtGui import QImage
+
+
+class ImageUtils:
+    @staticmethod
+    def getPixelArray(image: QImage) -> numpy.ndarray:
+        """
+        Wraps an ARGB32 image's pixels as a (height, width, 4) uint8 array without copying.
+        Writing to the array writes to the image. Channels are in memory order, which is B, G, R, A on little endian.
+        """
+        pixels = image.bits()
+        pixels.setsize(image.sizeInBytes())
+        rows = numpy.ndarray(shape = (image.height(), image.bytesPerLine()), dtype = numpy.uint8, buffer = pixels)
+        return rows[:, :image.width() * 4].reshape(image.height(), image.width(), 4)
+
+    @staticmethod
+    def tint(image: QImage, rgba: list[int]) -> QImage:
+        # Multiply every pixel's color by the tint color, leaving alpha alone.
+        tinted = image.convertToFormat(QImage.Format.Format_ARGB32)
+        pixels = ImageUtils.getPixelArray(tinted)
+        factors = numpy.array([rgba[2], rgba[1], rgba[0]], dtype = numpy.float32) / 255.0
+        pixels[:, :, 0:3] = numpy.rint(pixels[:, :, 0:3] * factors).astype(numpy.uint8)
+        return tinted
+
+    @staticmethod
+    def isTransparent(image: QImage) -> bool:
+        if not image.hasAlphaChannel():
+            return False
+        if image.format() != QImage.Format.Format_ARGB32 and image.format() != QImage.Format.Format_ARGB32_Premultiplied:
+            image = image.convertToFormat(QImage.Format.Format_ARGB32)
+        return not ImageUtils.getPixelArray(image)[:, :, 3].any()
+
+    @staticmethod
+    def getOpaqueRect(image: QImage) -> QRect:
+        # The smallest rect holding every pixel that isn't fully transparent, empty if there are none.
+        # This only reads, so it uses constBits(), which doesn't make a copy when the image is shared like bits() does.
+        pixels = image.constBits()
+        pixels.setsize(image.sizeInBytes())
+        rows = numpy.ndarray(shape = (image.height(), image.bytesPerLine()), dtype = numpy.uint8, buffer = pixels)
+        alpha = rows[:, 3:image.width() * 4:4]
+        rows = numpy.flatnonzero(alpha.any(axis = 1))
+        columns = numpy.flatnonzero(alpha.any(axis = 0))
+        if len(rows) == 0:
+            return QRect()
+        return QRect(int(columns[0]), int(rows[0]), int(columns[-1] - columns[0]) + 1, int(rows[-1] - rows[0]) + 1)
+
+    @staticmethod
+    def applyLut(image: QImage, lut: numpy.ndarray, channel: int = 2) -> QImage:
+        """
+        Recolors an image by looking every pixel's channel value up in a (256, 4) B, G, R, A table.
+        Channel is in memory order, so 2 is red. The table's alpha is scaled by the pixel's own,
+        so antialiased edges stay soft, and fully transparent pixels stay transparent.
+        """
+        source = image
+        if source.format() != QImage.Format.Format_ARGB32:
+            source = source.convertToFormat(QImage.Format.Format_ARGB32)
+        source_pixels = ImageUtils.getPixelArray(source)
+
+        recolored = QImage(source.size(), QImage.Format.Format_ARGB32)
+        pixels = ImageUtils.getPixelArray(recolored)
+        pixels[:] = lut[source_pixels[:, :, channel]]
+        source_alpha = source_pixels[:, :, 3]
+        pixels[:, :, 3] = (pixels[:, :, 3].astype(numpy.uint16) * source_alpha + 127) // 255
+        pixels[source_alpha == 0] = 0
+        return recolored
+
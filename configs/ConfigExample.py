@@ -20,7 +20,11 @@ app_settings = AppSettings(
 clock_settings = ClockSettings(
     is_digital = False,
     digital_format = "{0:%I:%M %p}",
-    digital_size = 250
+    digital_size = 250,
+    hand_cache_mb = 32,
+    is_painted = False,
+    sweep_fps = 0,
+    sweep_budget = 10
 )
 
 wx_settings = WxSettings(
@@ -34,17 +38,41 @@ wx_settings = WxSettings(
     radar_api_key = "RainViewerAPIKey",
     radar_color = 4,
     radar_refresh = 15,
+    radar_stagger_secs = 20,
     radar_smoothing = True,
     radar_snow = True,
     radar_0_zoom = 10,
     radar_1_zoom = 6,
+    radar_0_tile_size = 256,
+    radar_1_tile_size = 256,
+    radar_max_requests = 4,
+    radar_tile_timeout = 10,
+    radar_tile_retries = 3,
+    radar_stall_secs = 60,
+    radar_tile_cache_mb = 32,
+    radar_cache_mb = 100,
+    radar_cache_hours = 2,
+    radar_export_png = False,
+    radar_indexed = False,
+    radar_recolor = False,
+    radar_app_color_ramp = False,
 
     show_map = True,
     map_provider = MapProviderKey.GOOGLE_MAP,
     map_api_key = "GoogleMapAPIKey",
     marker_icon = "teardrop_dot.png",
     marker_size = "mid",
-    show_marker = True
+    show_marker = True,
+    map_cache_mb = 50,
+    map_cache_days = 90,
+
+    cache_evict_minutes = 10,
+    # To run against a local StandInServer.py instead of the real servers.
+    #base_urls = dict.fromkeys(
+    #    ["api.rainviewer.com", "www.rainviewer.com", "api.openweathermap.org", "maps.googleapis.com"],
+    #    "http://127.0.0.1:8765"
+    #)
+    base_urls = None
 )
 
 config = Config(
@@ -57,11 +57,19 @@ class ClockSettings:
             self,
             is_digital: bool = False,              # Analog Face = False, Digital Face = True.
             digital_format: str = "{0:%I:%M %p}",  # Format for the digital clock face.
-            digital_size: int = 250                # Font size for the digital clock face.
+            digital_size: int = 250,               # Font size for the digital clock face.
+            hand_cache_mb: int = 32,               # Memory budget for the analog clock's pre-rotated hands, 0 rotates them every tick.
+            is_painted: bool = False,              # Labels = False, Painted = True. Painted only redraws around the hands that moved.
+            sweep_fps: int = 0,                    # Frames a second for a sweeping second hand, 0 ticks once a second. Sweeping is always painted.
+            sweep_budget: int = 10                 # Percent of a core the sweep can use, its frame rate drops to stay under it.
     ):
         self.is_digital = is_digital
         self.digital_format = digital_format
         self.digital_size = digital_size
+        self.hand_cache_mb = hand_cache_mb
+        self.is_painted = is_painted
+        self.sweep_fps = sweep_fps
+        self.sweep_budget = sweep_budget
 
 class WxSettings:
     def __init__(
@@ -75,18 +83,37 @@ class WxSettings:
             radar_provider: int = None,            # RadarUtils.ProviderKey value.
             radar_api_key: str = "",               # API key for that provider
             radar_color: int = 4,                  # Rainviewer radar color style: https://www.rainviewer.com/api/color-schemes.html
-            radar_refresh: int = 15,               # Radar refresh time in minutes.
+            radar_refresh: int = 15,               # Longest time between radar refreshes in minutes, they usually follow new frames sooner.
+            radar_stagger_secs: int = 20,          # The bottom radar fetches new frames this many seconds after the top one.
             radar_smoothing: bool = False,         # Rainviewer radar smoothing.
             radar_snow: bool = False,              # Rainviewer radar shows snow as different color.
             radar_0_zoom: int = 10,                # The zoom level for the top radar.
             radar_1_zoom: int = 6,                 # The zoom level for the bottom radar.
+            radar_0_tile_size: int = 256,          # Radar tile size for the top radar, 256 or 512. 512 needs about 4x fewer requests.
+            radar_1_tile_size: int = 256,          # Radar tile size for the bottom radar, 256 or 512.
+            radar_max_requests: int = 4,           # Max radar tile requests in flight at once, per host.
+            radar_tile_timeout: int = 10,          # Seconds a radar tile request can go without progress before it is dropped.
+            radar_tile_retries: int = 3,           # Times a failed radar tile gets tried again, with backoff, before it is left out.
+            radar_stall_secs: int = 60,            # Restart the radar fetch if no tile lands for this many seconds.
+            radar_tile_cache_mb: int = 32,         # Memory budget for decoded radar tiles shared by all radars.
+            radar_cache_mb: int = 100,             # Disk budget for each of the radar frame and radar tile caches.
+            radar_cache_hours: int = 2,            # Radar cache files unused for this long get evicted.
+            radar_export_png: bool = False,        # Also save every radar frame as a PNG, frames are kept raw either way.
+            radar_indexed: bool = False,           # Keep radar frames as 8 bit palette images, about a quarter of the memory.
+            radar_recolor: bool = False,           # Fetch tiles once in RainViewer's dBZ scheme and color them here.
+            radar_app_color_ramp: bool = False,    # When recoloring, use a ramp of the app color instead of radar_color.
 
             show_map: bool = False,                # Hide map = False, show map = True.
             map_provider: int = None,              # MapUtils.ProviderKey value.
             map_api_key:str = "",                  # API key for that provider.
             marker_icon:str = "teardrop_dot.png",  # Icon for marker.
             marker_size:str = "mid",               # Size of the marker.
-            show_marker:bool = False               # Show a marker on the map.
+            show_marker:bool = False,              # Show a marker on the map.
+            map_cache_mb: int = 50,                # Disk budget for the map cache.
+            map_cache_days: int = 90,              # Map cache files unused for this long get evicted.
+
+            cache_evict_minutes: int = 10,         # How often the caches get held to their budgets.
+            base_urls: dict = None                 # Point hosts at other servers, like {"api.rainviewer.com": "http://127.0.0.1:8765"}.
     ):
         self.is_metric = is_metric
         self.is_wind_degrees = is_wind_degrees
@@ -97,11 +124,25 @@ class WxSettings:
         self.radar_provider = radar_provider
         self.radar_api_key = radar_api_key
         self.radar_refresh = radar_refresh
+        self.radar_stagger_secs = radar_stagger_secs
         self.radar_color = radar_color
         self.radar_0_zoom = radar_0_zoom
         self.radar_1_zoom = radar_1_zoom
+        self.radar_0_tile_size = radar_0_tile_size
+        self.radar_1_tile_size = radar_1_tile_size
         self.radar_smoothing = radar_smoothing
         self.radar_snow = radar_snow
+        self.radar_max_requests = radar_max_requests
+        self.radar_tile_timeout = radar_tile_timeout
+        self.radar_tile_retries = radar_tile_retries
+        self.radar_stall_secs = radar_stall_secs
+        self.radar_tile_cache_mb = radar_tile_cache_mb
+        self.radar_cache_mb = radar_cache_mb
+        self.radar_cache_hours = radar_cache_hours
+        self.radar_export_png = radar_export_png
+        self.radar_indexed = radar_indexed
+        self.radar_recolor = radar_recolor
+        self.radar_app_color_ramp = radar_app_color_ramp
 
         self.show_map = show_map
         self.map_provider = map_provider
@@ -109,6 +150,11 @@ class WxSettings:
         self.marker_icon = marker_icon
         self.marker_size = marker_size
         self.show_marker = show_marker
+        self.map_cache_mb = map_cache_mb
+        self.map_cache_days = map_cache_days
+
+        self.cache_evict_minutes = cache_evict_minutes
+        self.base_urls = base_urls
 
 class Config:
     def __init__(
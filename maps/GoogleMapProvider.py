@@ -1,11 +1,12 @@
-import os
 from typing import Callable
 
 from PyQt6.QtCore import QUrl, QSize, QFile
 from PyQt6.QtGui import QPixmap
-from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+from PyQt6.QtNetwork import QNetworkReply, QNetworkRequest
 
+from NetworkUtils import NetworkService
 from assets.AssetUtils import AssetUtils
+from assets.CacheManager import CacheManager
 from configs.ConfigUtils import Config
 from maps.MapProvider import MapProvider
 
@@ -16,9 +17,9 @@ class GoogleMapProvider(MapProvider):
         self.app_color = config.app_settings.color.hex_value
         self.show_marker = config.wx_settings.show_marker
         self.marker_size = config.wx_settings.marker_size
-        self.net_man = QNetworkAccessManager(self)
+        self.network = NetworkService.getService()
         self.on_map_callback = None
-        self.reply = None
+        self.request_data = None
 
         # Things that get set when we call for a new map.
         self.latitude = 0
@@ -42,10 +43,16 @@ class GoogleMapProvider(MapProvider):
         self.size = size
 
         cached_map_file = AssetUtils.getCachedMapFile(latitude, longitude, zoom, size)
-        if os.path.exists(cached_map_file):
+        cached_map = QPixmap()
+        if CacheManager.getManager().has(cached_map_file):
+            cached_map = QPixmap(cached_map_file)
+            if cached_map.isNull():
+                CacheManager.getManager().remove(cached_map_file)
+
+        if not cached_map.isNull():
             # DEBUGGING
             print(f"Using cached map file: {cached_map_file}")
-            callback(QPixmap(cached_map_file))
+            callback(cached_map)
 
         else:
             map_url = f"http://maps.googleapis.com/maps/api/staticmap?key={self.api_key}"
@@ -59,19 +66,21 @@ class GoogleMapProvider(MapProvider):
             # DEBUGGING
             print(f"GoogleMapProvider.getMap(): {map_url}")
 
-            if self.reply is not None:
+            if self.request_data is not None:
                 print("GoogleMapProvider.getMap(): Aborting previous request.")
-                self.reply.abort()
-                self.reply = None
+                # A cancelled request never lands in mapCallback().
+                self.network.cancel(self.request_data)
+                self.request_data = None
 
             request = QNetworkRequest(QUrl(map_url))
-            self.reply = self.net_man.get(request)
-            self.reply.finished.connect(self.mapCallback)
+            self.request_data = self.network.get(request, self.mapCallback)
+
+    def mapCallback(self, reply: QNetworkReply):
+        self.request_data = None
 
-    def mapCallback(self):
-        if self.reply.error() == QNetworkReply.NetworkError.NoError:
+        if reply.error() == QNetworkReply.NetworkError.NoError:
             pixmap = QPixmap()
-            pixmap.loadFromData(self.reply.readAll())
+            pixmap.loadFromData(reply.readAll())
 
             # Save this to our cache.
             cache_file_name = AssetUtils.getCachedMapFile(self.latitude, self.longitude, self.zoom, self.size)
@@ -81,6 +90,7 @@ class GoogleMapProvider(MapProvider):
 
             if success:
                 print(f"GoogleMapProvider.mapCallback(): map cache saved")
+                CacheManager.getManager().add(cache_file_name, reply.url().host())
             else:
                 print(f"GoogleMapProvider.mapCallback(): map cache not saved")
 
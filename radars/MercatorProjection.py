@@ -1,6 +1,7 @@
 # http://stackoverflow.com/questions/12507274/how-to-get-bounds-of-a-google-static-map
 import math
 
+import numpy
 from PyQt6.QtCore import QPointF
 
 
@@ -36,12 +37,14 @@ class MercatorProjection:
         self.pixels_per_long_degree = Utils.MERCATOR_RANGE / 360.0
         self.pixels_per_long_radian = Utils.MERCATOR_RANGE / (2.0 * math.pi)
 
-    def fromLatLngToPoint(self, lat_lng: LatLng, point:QPointF = QPointF(0, 0)) -> QPointF:
-        point.x = self.pixel_origin.x() + lat_lng.lng * self.pixels_per_long_degree
+    def fromLatLngToPoint(self, lat_lng: LatLng, point: QPointF = None) -> QPointF:
+        if point is None:
+            point = QPointF()
+        point.setX(self.pixel_origin.x() + lat_lng.lng * self.pixels_per_long_degree)
         # NOTE(appleton): Truncating to 0.9999 effectively limits latitude to
         # 89.189.This is about a third of a tile past the edge of world tile
         sin_y = bound(math.sin(degreesToRadians(lat_lng.lat)), -0.9999, 0.9999)
-        point.y = self.pixel_origin.y() + 0.5 * math.log((1 + sin_y) / (1.0 - sin_y)) * -self.pixels_per_long_radian
+        point.setY(self.pixel_origin.y() + 0.5 * math.log((1 + sin_y) / (1.0 - sin_y)) * -self.pixels_per_long_radian)
         return point
 
     def fromPointToLatLng(self, point: QPointF) -> LatLng:
@@ -51,9 +54,93 @@ class MercatorProjection:
         latitude = radiansToDegrees(2.0 * math.atan(math.exp(lat_radians)) - math.pi / 2.0)
         return LatLng(latitude, longitude)
 
+    def fromLatLngsToPoints(self, latitudes: numpy.ndarray, longitudes: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+        # The same as fromLatLngToPoint(), for whole arrays at once.
+        x = self.pixel_origin.x() + numpy.asarray(longitudes, dtype = numpy.float64) * self.pixels_per_long_degree
+        sin_y = numpy.clip(numpy.sin(numpy.radians(numpy.asarray(latitudes, dtype = numpy.float64))), -0.9999, 0.9999)
+        y = self.pixel_origin.y() + 0.5 * numpy.log((1 + sin_y) / (1.0 - sin_y)) * -self.pixels_per_long_radian
+        return x, y
+
+    def fromPointsToLatLngs(self, x: numpy.ndarray, y: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+        # The same as fromPointToLatLng(), for whole arrays at once.
+        longitudes = (numpy.asarray(x, dtype = numpy.float64) - self.pixel_origin.x()) / self.pixels_per_long_degree
+        lat_radians = (numpy.asarray(y, dtype = numpy.float64) - self.pixel_origin.y()) / -self.pixels_per_long_radian
+        latitudes = numpy.degrees(2.0 * numpy.arctan(numpy.exp(lat_radians)) - math.pi / 2.0)
+        return latitudes, longitudes
+
+
+class ViewportData:
+    """
+    Everything about the tiles behind a view: which tiles, at what zoom, and where they sit relative to the view.
+    x_offset and y_offset are where the first tile's corner lands in the view, so they are zero or negative.
+    """
+    def __init__(self, center: LatLng, zoom: int, width: int, height: int, tile_size: int):
+        self.center = center
+        self.zoom = zoom
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.tile_zoom = Utils.getTileZoom(zoom, tile_size)
+        self.scale = 2.0 ** zoom
+
+        # The view's edges in world pixels, at zoom 0.
+        center_x, center_y = Utils.projection.fromLatLngsToPoints(center.lat, center.lng)
+        self.west = float(center_x) - (width / 2.0) / self.scale
+        self.east = float(center_x) + (width / 2.0) / self.scale
+        self.north = float(center_y) - (height / 2.0) / self.scale
+        self.south = float(center_y) + (height / 2.0) / self.scale
+
+        tiles_per_point = self.scale / tile_size
+        nw_x = self.west * tiles_per_point
+        nw_y = self.north * tiles_per_point
+        self.x_list = list(range(int(nw_x), int(self.east * tiles_per_point) + 1))
+        self.y_list = list(range(int(nw_y), int(self.south * tiles_per_point) + 1))
+        self.tiles_width = len(self.x_list)
+        self.tiles_height = len(self.y_list)
+        self.total_width = self.tiles_width * tile_size
+        self.total_height = self.tiles_height * tile_size
+        self.x_offset = int((int(nw_x) - nw_x) * tile_size)
+        self.y_offset = int((int(nw_y) - nw_y) * tile_size)
+
+    def getCorners(self) -> dict:
+        latitudes, longitudes = Utils.projection.fromPointsToLatLngs([self.east, self.west], [self.north, self.south])
+        return {
+            'N': float(latitudes[0]),
+            'E': float(longitudes[0]),
+            'S': float(latitudes[1]),
+            'W': float(longitudes[1]),
+        }
+
+    def toPixels(self, latitudes: numpy.ndarray, longitudes: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+        # Where lat/lngs land in the view, in view pixels from the top left corner.
+        x, y = Utils.projection.fromLatLngsToPoints(latitudes, longitudes)
+        return (x - self.west) * self.scale, (y - self.north) * self.scale
+
+    def fromPixels(self, x: numpy.ndarray, y: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+        return Utils.projection.fromPointsToLatLngs(
+            self.west + numpy.asarray(x, dtype = numpy.float64) / self.scale,
+            self.north + numpy.asarray(y, dtype = numpy.float64) / self.scale
+        )
+
+
 class Utils:
     MERCATOR_RANGE = 256
 
+    # The projection never changes, so everybody shares one.
+    projection = None
+
+    # Viewports by (latitude, longitude, zoom, width, height, tile size), since every widget asks again on every resize.
+    viewports = {}
+
+    @staticmethod
+    def getViewport(center: LatLng, zoom: int, width: int, height: int, tile_size: int = MERCATOR_RANGE) -> ViewportData:
+        key = (center.lat, center.lng, zoom, width, height, tile_size)
+        viewport = Utils.viewports.get(key)
+        if viewport is None:
+            viewport = ViewportData(center, zoom, width, height, tile_size)
+            Utils.viewports[key] = viewport
+        return viewport
+
     @staticmethod
     def getCorners(
             center: LatLng,
@@ -61,37 +148,29 @@ class Utils:
             map_width: int,
             map_height: int
     ):
-        scale = 2.0**zoom
-        projection = MercatorProjection()
-        center_point = projection.fromLatLngToPoint(center)
-        sw_point = QPointF(
-            center_point.x - (map_width / 2.0) / scale,
-            center_point.y + (map_height / 2.0) / scale
-        )
-        sw_lat_long = projection.fromPointToLatLng(sw_point)
+        return Utils.getViewport(center, zoom, map_width, map_height).getCorners()
 
-        ne_point = QPointF(
-            center_point.x + (map_width / 2.0) / scale,
-            center_point.y - (map_height / 2.0) / scale
-        )
-        ne_lat_long = projection.fromPointToLatLng(ne_point)
+    # https://wiki.openstreetmap.org/wiki/Slippy_map_tilenames
+    @staticmethod
+    def getTileZoom(zoom: int, tile_size: int = MERCATOR_RANGE) -> int:
+        # Bigger tiles cover more of the world at the same pixel density, so they come from a lower zoom level.
+        return zoom - int(math.log2(tile_size / Utils.MERCATOR_RANGE))
 
-        return {
-            'N': ne_lat_long.lat,
-            'E': ne_lat_long.lng,
-            'S': sw_lat_long.lat,
-            'W': sw_lat_long.lng,
-        }
+    @staticmethod
+    def getTilesXY(latitudes: numpy.ndarray, longitudes: numpy.ndarray, zoom: int, tile_size: int = MERCATOR_RANGE) -> tuple[numpy.ndarray, numpy.ndarray]:
+        # Fractional tile coordinates for tile_size pixel tiles, at the pixel density of 256 pixel tiles at zoom.
+        # Slippy map tiles are just world pixels scaled by the number of tiles across, so this is one projection.
+        x, y = Utils.projection.fromLatLngsToPoints(latitudes, longitudes)
+        tiles_per_point = 2.0 ** zoom / tile_size
+        return x * tiles_per_point, y * tiles_per_point
 
-    # https://wiki.openstreetmap.org/wiki/Slippy_map_tilenames
     @staticmethod
-    def getTileXY(lat_long: LatLng, zoom: int):
-        latitude_radians = math.radians(lat_long.lat)
-        n = 2.0 ** zoom
-        xtile = (lat_long.lng + 180.0) / 360.0 * n
-        ytile = ((1.0 - math.log(math.tan(latitude_radians) +
-                 (1 / math.cos(latitude_radians))) / math.pi) / 2.0 * n)
+    def getTileXY(lat_long: LatLng, zoom: int, tile_size: int = MERCATOR_RANGE):
+        xtile, ytile = Utils.getTilesXY(lat_long.lat, lat_long.lng, zoom, tile_size)
         return {
-            'X': xtile,
-            'Y': ytile
-        }
\ No newline at end of file
+            'X': float(xtile),
+            'Y': float(ytile)
+        }
+
+
+Utils.projection = MercatorProjection()
\ No newline at end of file
@@ -0,0 +1,168 @@
+import os
+from typing import Callable
+
+import numpy
+from PyQt6.QtCore import QObject, QUrl
+from PyQt6.QtNetwork import QNetworkReply, QNetworkRequest
+
+from MetricsUtils import Metrics
+from NetworkUtils import NetworkService, Priority
+from assets.AssetUtils import AssetUtils
+
+COLOR_TABLE_URL = "https://www.rainviewer.com/files/rainviewer_api_colors_table.csv"
+
+# Tiles get fetched in this scheme, where every pixel's gray level stands for a dBZ value.
+CANONICAL_SCHEME = 0
+
+# The app color ramp starts at light drizzle and is fully saturated by heavy rain.
+RAMP_MIN_DBZ = 5
+RAMP_MAX_DBZ = 65
+
+
+class RadarColorTable(QObject):
+    """
+    RainViewer's color scheme table, loaded once for the whole process.
+    Each row is a dBZ value followed by its color in every scheme, schemes in their number order starting at 0.
+    Since scheme 0 is just the dBZ value as a gray level, it tells us which dBZ a canonical tile's pixel stands for,
+    and from there we can build a lookup table into any other scheme, or into a ramp of the app color.
+    The table is kept next to the assets, so it is only ever downloaded once.
+    """
+    instance = None
+
+    @staticmethod
+    def getTable():
+        if RadarColorTable.instance is None:
+            RadarColorTable.instance = RadarColorTable()
+        return RadarColorTable.instance
+
+    @staticmethod
+    def parseColor(hex_value: str) -> list[int]:
+        # "#RRGGBB" or "#RRGGBBAA", returned as B, G, R, A to match QImage's memory order.
+        hex_value = hex_value.strip().lstrip("#")
+        alpha = int(hex_value[6:8], 16) if len(hex_value) >= 8 else 255
+        return [int(hex_value[4:6], 16), int(hex_value[2:4], 16), int(hex_value[0:2], 16), alpha]
+
+    def __init__(self):
+        super().__init__()
+        self.network = NetworkService.getService()
+        self.request_data = None
+        self.failed = False
+        self.subscribers = []
+        self.dbz_list = []
+        self.scheme_colors = []
+        self.luts = {}
+
+    def subscribe(self, callback: Callable[[bool], None]):
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+
+    def hasTable(self) -> bool:
+        return len(self.dbz_list) > 0
+
+    def load(self):
+        # Subscribers hear back once, with True when we have the table and False when we couldn't get it.
+        if self.hasTable() or self.failed:
+            self.notify()
+            return
+        if self.request_data is not None:
+            return
+
+        table_file = AssetUtils.getRadarColorTableFile()
+        if os.path.exists(table_file):
+            with open(table_file, "r", encoding = "utf-8") as file:
+                if self.parse(file.read()):
+                    self.notify()
+                    return
+
+        self.request_data = self.network.get(QNetworkRequest(QUrl(COLOR_TABLE_URL)), self.onTable, Priority.HIGH)
+
+    def onTable(self, reply: QNetworkReply):
+        self.request_data = None
+
+        if reply.error() != QNetworkReply.NetworkError.NoError:
+            print(f"RadarColorTable.onTable(): {reply.errorString()}")
+            Metrics.increment("radar.color_table.errors")
+            self.failed = True
+            self.notify()
+            return
+
+        table_string = reply.readAll().data().decode("utf-8")
+        if self.parse(table_string):
+            with open(AssetUtils.getRadarColorTableFile(), "w", encoding = "utf-8") as file:
+                file.write(table_string)
+        else:
+            print(f"RadarColorTable.onTable(): Couldn't parse the color table from {reply.url()}")
+            self.failed = True
+        self.notify()
+
+    def parse(self, table_string: str) -> bool:
+        dbz_list = []
+        scheme_colors = []
+        for line in table_string.splitlines()[1:]:
+            values = line.split(",")
+            if len(values) < 2:
+                continue
+            try:
+                dbz_list.append(int(float(values[0])))
+                scheme_colors.append([RadarColorTable.parseColor(value) for value in values[1:]])
+            except ValueError:
+                return False
+
+        self.dbz_list = dbz_list
+        self.scheme_colors = scheme_colors
+        self.luts = {}
+        return self.hasTable()
+
+    def notify(self):
+        for callback in self.subscribers:
+            callback(self.hasTable())
+
+    def fillGaps(self, lut: numpy.ndarray) -> numpy.ndarray:
+        """
+        The table doesn't list every gray level, and smoothed tiles land on the ones in between too,
+        so each unlisted level takes the color of the nearest listed level below it.
+        Levels below the lowest listed one stay transparent.
+        """
+        listed = [colors[CANONICAL_SCHEME][2] for colors in self.scheme_colors]
+        levels = numpy.full(256, -1)
+        levels[listed] = listed
+        levels = numpy.maximum.accumulate(levels)
+        filled = lut[numpy.maximum(levels, 0)]
+        filled[levels < 0] = 0
+        return filled
+
+    def getSchemeLut(self, scheme: int) -> numpy.ndarray | None:
+        # Canonical gray level (256) to B, G, R, A in the scheme, None if the table doesn't have that scheme.
+        if scheme in self.luts:
+            return self.luts[scheme]
+        if not self.hasTable() or scheme >= len(self.scheme_colors[0]):
+            return None
+
+        lut = numpy.zeros((256, 4), dtype = numpy.uint8)
+        for colors in self.scheme_colors:
+            lut[colors[CANONICAL_SCHEME][2]] = colors[scheme]
+        lut = self.fillGaps(lut)
+
+        self.luts[scheme] = lut
+        return lut
+
+    def getRampLut(self, rgba: list[int]) -> numpy.ndarray | None:
+        # Canonical gray level (256) to a ramp from a pale wash of the color up to the full color, as B, G, R, A.
+        lut_name = "ramp_" + "_".join(str(value) for value in rgba)
+        if lut_name in self.luts:
+            return self.luts[lut_name]
+        if not self.hasTable():
+            return None
+
+        lut = numpy.zeros((256, 4), dtype = numpy.uint8)
+        color = numpy.array([rgba[2], rgba[1], rgba[0]], dtype = numpy.float32)
+        for dbz, colors in zip(self.dbz_list, self.scheme_colors):
+            if dbz < RAMP_MIN_DBZ:
+                continue
+            amount = min(1.0, (dbz - RAMP_MIN_DBZ) / (RAMP_MAX_DBZ - RAMP_MIN_DBZ))
+            lut[colors[CANONICAL_SCHEME][2], 0:3] = numpy.rint(255.0 + (color - 255.0) * (0.5 + 0.5 * amount))
+            lut[colors[CANONICAL_SCHEME][2], 3] = round(96 + 159 * amount)
+        lut = self.fillGaps(lut)
+
+        self.luts[lut_name] = lut
+        return lut
@@ -0,0 +1,129 @@
+from PyQt6.QtCore import QObject, QRunnable, QSize, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QPainter
+
+from MetricsUtils import Metrics
+from assets.ImageUtils import ImageUtils
+from radars.RadarData import RadarData
+from radars.RadarTileCache import EMPTY_TILE
+
+
+class CompositeData:
+    """
+    Everything a composite job needs, copied off the provider so the job never reaches back into it.
+    """
+    def __init__(
+            self,
+            generation: int,
+            timestamp: int,
+            digest: int,
+            tile_images: list[QImage],
+            tiles_width: int,
+            tiles_height: int,
+            tile_size: int,
+            x_offset: int,
+            y_offset: int,
+            size: QSize,
+            slot: int,
+            target_image: QImage,
+            image_owner: object,
+            export_file_path: str
+    ):
+        self.generation = generation
+        self.timestamp = timestamp
+        self.digest = digest
+        self.tile_images = tile_images
+        self.tiles_width = tiles_width
+        self.tiles_height = tiles_height
+        self.tile_size = tile_size
+        self.x_offset = x_offset
+        self.y_offset = y_offset
+        self.size = size
+        self.slot = slot
+        self.target_image = target_image
+        self.image_owner = image_owner
+        self.export_file_path = export_file_path
+        # Cleared by the job when the frame couldn't go in the store.
+        self.stored = True
+        # Set when a tile this frame is missing might still turn up, so it's worth going back for.
+        self.retryable = False
+        # Tiles still in the canonical scheme get colored with color_lut by the job,
+        # and handed back in recolored, by their recolor_keys, for the tile cache.
+        self.color_lut = None
+        self.recolor_keys = []
+        self.recolored = {}
+
+
+class RadarCompositorSignals(QObject):
+    # QRunnables can't emit, so the jobs post their finished frames through this.
+    # It lives on the GUI thread, so the slot runs there.
+    finished = pyqtSignal(object, object)
+
+
+class RadarCompositeJob(QRunnable):
+    """
+    Combines a frame's tiles and crops it, all on a QThreadPool thread.
+    Frames carry no label, so frames with the same tiles come out the same, the widget shows the time on top.
+    The frame is painted straight into the target image, which is a slot in the frame store, so nothing gets copied or encoded.
+    Only QImages are touched here, QPixmaps stay on the GUI thread.
+    """
+    def __init__(self, composite_data: CompositeData, signals: RadarCompositorSignals):
+        super().__init__()
+        self.composite_data = composite_data
+        self.signals = signals
+
+    def run(self):
+        job_start = Metrics.now()
+        RadarCompositeJob.recolorTiles(self.composite_data)
+        radar_data = RadarCompositeJob.combineTiles(self.composite_data)
+        Metrics.recordTiming("radar.composite", Metrics.elapsedMs(job_start))
+        self.signals.finished.emit(self.composite_data, radar_data)
+
+    @staticmethod
+    def recolorTiles(composite_data: CompositeData):
+        for index, variant_key in enumerate(composite_data.recolor_keys):
+            if variant_key is None:
+                continue
+            recolored_image = ImageUtils.applyLut(composite_data.tile_images[index], composite_data.color_lut)
+            composite_data.tile_images[index] = recolored_image
+            composite_data.recolored[variant_key] = recolored_image
+
+    @staticmethod
+    def combineTiles(composite_data: CompositeData) -> RadarData:
+        # QPainter can't paint into an indexed image, so those frames get painted first and quantized after.
+        target_image = composite_data.target_image
+        if target_image.format() == QImage.Format.Format_Indexed8:
+            radar_image = QImage(composite_data.size, QImage.Format.Format_ARGB32_Premultiplied)
+        else:
+            radar_image = target_image
+        radar_image.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter()
+        painter.begin(radar_image)
+
+        # Tiles are drawn already shifted by the crop offsets, anything past the edges just gets clipped.
+        tile_size = composite_data.tile_size
+        tile_index = 0
+        for y in range(0, composite_data.tiles_height * tile_size, tile_size):
+            for x in range(0, composite_data.tiles_width * tile_size, tile_size):
+                tile_image = composite_data.tile_images[tile_index]
+                if tile_image is not EMPTY_TILE and tile_image.format() == QImage.Format.Format_ARGB32:
+                    painter.drawImage(x + composite_data.x_offset, y + composite_data.y_offset, tile_image)
+
+                tile_index += 1
+
+        painter.end()
+
+        image_owner = composite_data.image_owner
+        if radar_image is not target_image:
+            if image_owner.quantize(radar_image, target_image, composite_data.slot):
+                radar_image = target_image
+            else:
+                # Too many colors for the palette, this frame stays ARGB32 and never makes it into the store.
+                composite_data.stored = False
+                image_owner = None
+
+        # PNGs are only an export now, the store keeps the frame for the next run.
+        if composite_data.export_file_path:
+            radar_image.save(composite_data.export_file_path)
+
+        return RadarData(composite_data.timestamp, composite_data.export_file_path, radar_image, image_owner, composite_data.digest)
@@ -1,9 +1,14 @@
+import bisect
+import hashlib
+
 from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QImage, QPixmap
 
 class SizeData:
-    def __init__(self, zoom: int, size: QSize):
+    def __init__(self, zoom: int, size: QSize, tile_size: int = 256):
         self.zoom = zoom
         self.size = size
+        self.tile_size = tile_size
 
 class TilePathData:
     def __init__(self, timestamp: int, path: str):
@@ -15,17 +20,96 @@ class TilePathData:
 
 
 class TileUrlsData:
-    def __init__(self, timestamp: int, urls: list[str]):
+    def __init__(self, timestamp: int, urls: list[str], keys: list[tuple]):
         self.timestamp = timestamp
         self.urls = urls
+        self.keys = keys
 
     def __lt__(self, other):
         return self.timestamp < other.timestamp
 
 class RadarData:
-    def __init__(self, timestamp: int, file_path: str):
+    def __init__(self, timestamp: int, file_path: str, image: QImage, image_owner: object = None, digest: int = 0):
         self.timestamp = timestamp
         self.file_path = file_path
+        self.image = image
+        # Frames with the same digest look the same, 0 means we don't know.
+        self.digest = digest
+        # Whatever owns the memory the image points into, it has to live as long as the image does.
+        self.image_owner = image_owner
+        self.pixmap = None
+        # Partial frames have placeholders for tiles we couldn't get, and get replaced once we do.
+        self.partial = False
+
+    def getPixmap(self) -> QPixmap:
+        # QPixmaps have to be made on the GUI thread, so we build it the first time it gets shown and hold onto it.
+        # Indexed frames get converted every time instead, holding a full color pixmap would undo the memory they save.
+        if self.image.format() == QImage.Format.Format_Indexed8:
+            return QPixmap.fromImage(self.image)
+        if self.pixmap is None:
+            self.pixmap = QPixmap.fromImage(self.image)
+        return self.pixmap
 
     def __lt__(self, other):
-        return self.timestamp < other.timestamp
\ No newline at end of file
+        return self.timestamp < other.timestamp
+
+class RadarFrameRing:
+    """
+    A fixed size, oldest (0) to newest (len - 1) buffer of decoded radar frames.
+    Adding a frame past capacity drops the oldest one, so the animation never has to touch the disk.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.frames = []
+
+    def add(self, radar_data: RadarData):
+        if self.hasTimestamp(radar_data.timestamp):
+            return
+        self.remove(radar_data.timestamp)
+        bisect.insort(self.frames, radar_data)
+        while len(self.frames) > self.capacity:
+            self.frames.pop(0)
+
+    def remove(self, timestamp: int):
+        self.frames = [radar_data for radar_data in self.frames if radar_data.timestamp != timestamp]
+
+    def findDigest(self, digest: int) -> RadarData | None:
+        for radar_data in self.frames:
+            if radar_data.digest == digest:
+                return radar_data
+        return None
+
+    def hasTimestamp(self, timestamp: int) -> bool:
+        # Partial frames don't count, we still want the rest of their tiles.
+        for radar_data in self.frames:
+            if radar_data.timestamp == timestamp:
+                return not radar_data.partial
+        return False
+
+    def hasPartial(self) -> bool:
+        for radar_data in self.frames:
+            if radar_data.partial:
+                return True
+        return False
+
+    def __getitem__(self, index: int) -> RadarData:
+        return self.frames[index]
+
+    def __len__(self):
+        return len(self.frames)
+
+class FrameTilesData:
+    def __init__(self, timestamp: int, tile_count: int):
+        self.timestamp = timestamp
+        self.tile_images = [None] * tile_count
+        self.tile_digests = [b""] * tile_count
+        self.remaining = tile_count
+        self.failed = False
+        # Whether any tile we couldn't get might still turn up. Ones the server says aren't there never will.
+        self.retryable = False
+        # The tile cache key for the color each tile still needs, None for tiles that are ready to paint.
+        self.recolor_keys = [None] * tile_count
+
+    def getDigest(self) -> int:
+        # A frame is the sum of its tiles, so the tile fingerprints in grid order fingerprint the frame.
+        return int.from_bytes(hashlib.sha1(b"".join(self.tile_digests)).digest()[:8], "little")
@@ -0,0 +1,72 @@
+from radars.MercatorProjection import Utils
+from radars.RadarData import TilePathData, TileUrlsData
+
+
+class RadarFramePlanner:
+    """
+    Keeps the tile urls for the frames we are holding onto, keyed by timestamp.
+    Each manifest is diffed against what we already planned, so only newly published frames get urls built,
+    and frames that fell off the end are handed back so they can be dropped.
+    """
+    def __init__(self, frame_count: int, radar_color: int, radar_smoothing: int, radar_snow: int):
+        self.frame_count = frame_count
+        self.radar_color = radar_color
+        self.radar_smoothing = radar_smoothing
+        self.radar_snow = radar_snow
+        self.zoom = 0
+        self.tile_size = Utils.MERCATOR_RANGE
+        self.x_list = []
+        self.y_list = []
+        self.frames = {}
+
+    def setGrid(self, zoom: int, x_list: list[int], y_list: list[int], tile_size: int):
+        # A new grid means every url we built is for the wrong tiles.
+        # zoom is the zoom level of the tiles themselves, which is lower than the view's for big tiles.
+        self.zoom = zoom
+        self.tile_size = tile_size
+        self.x_list = x_list
+        self.y_list = y_list
+        self.frames = {}
+
+    def update(self, host: str, item_list: list[TilePathData]) -> tuple[list[TileUrlsData], list[TileUrlsData]]:
+        """
+        item_list is ordered oldest (0) to newest (len - 1), like the manifest.
+        Returns the (added, expired) frames, both newest first.
+        """
+        wanted_list = item_list[-self.frame_count:]
+        wanted_timestamps = set(item.timestamp for item in wanted_list)
+
+        expired = []
+        for timestamp in list(self.frames.keys()):
+            if timestamp not in wanted_timestamps:
+                expired.append(self.frames.pop(timestamp))
+
+        added = []
+        for item in reversed(wanted_list):
+            if item.timestamp not in self.frames:
+                entry = self.planFrame(host, item)
+                self.frames[item.timestamp] = entry
+                added.append(entry)
+
+        expired.sort(reverse = True)
+        return added, expired
+
+    def planFrame(self, host: str, item: TilePathData) -> TileUrlsData:
+        url_list = []
+        key_list = []
+        for y in self.y_list:
+            for x in self.x_list:
+                url = f"{host}{item.path}/{self.tile_size}/"
+                url += f"{self.zoom}/{x}/{y}/{self.radar_color}/{self.radar_smoothing}_{self.radar_snow}.png"
+
+                url_list.append(url)
+                key_list.append((item.path, self.tile_size, self.zoom, x, y, self.radar_color, self.radar_smoothing, self.radar_snow))
+
+        return TileUrlsData(item.timestamp, url_list, key_list)
+
+    def hasFrame(self, timestamp: int) -> bool:
+        return timestamp in self.frames
+
+    def getFrames(self) -> list[TileUrlsData]:
+        # Newest first, since that is the order we want them fetched in.
+        return sorted(self.frames.values(), reverse = True)
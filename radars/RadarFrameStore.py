@@ -0,0 +1,291 @@
+import ctypes
+import mmap
+import os
+import struct
+import threading
+
+import numpy
+
+from PyQt6 import sip
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QImage
+
+from MetricsUtils import Metrics
+from assets.ImageUtils import ImageUtils
+
+# File layout:
+#   header:       magic, version, width, height, bytes per line, image format, slot count
+#   frame table:  timestamp, digest and slot of each frame, a timestamp of 0 means the entry is empty
+#   palette:      color count, then up to 256 ARGB32 colors shared by every frame, only used by indexed stores
+#   slots:        raw pixels, one frame per slot, each starting at a fixed offset
+HEADER_FORMAT = "<4sIIIIII"
+HEADER_SIZE = 64
+MAGIC = b"WXRF"
+VERSION = 3
+TABLE_ENTRY_FORMAT = "<qQq"
+TABLE_ENTRY_SIZE = struct.calcsize(TABLE_ENTRY_FORMAT)
+PALETTE_COLORS = 256
+PALETTE_SIZE = 4 + PALETTE_COLORS * 4
+
+
+class RadarFrameStore:
+    """
+    Raw radar frames in a memory mapped file, so frames never get PNG encoded or decoded on their way to the screen.
+    The compositor paints straight into a slot, and readers get a QImage that wraps the mapped bytes without a copy.
+    Since the file persists, the next run can show the frames it left behind without any decoding.
+    Frames that look the same share a slot, there are as many table entries as slots so every slot can still be used.
+
+    An indexed store keeps one byte per pixel against a palette shared by every frame, a quarter of the ARGB32 size.
+    Radar frames are a handful of scheme colors over transparency, so the palette rarely fills up,
+    and when it does the colors only used by frames that have since gone are handed out again.
+
+    QImages from here point into the map, so anything holding one has to hold onto the store too.
+    """
+    def __init__(self, file_path: str, size: QSize, slot_count: int, indexed: bool = False):
+        self.file_path = file_path
+        self.width = size.width()
+        self.height = size.height()
+        self.indexed = indexed
+        if indexed:
+            self.image_format = QImage.Format.Format_Indexed8
+            self.bytes_per_line = (self.width + 3) // 4 * 4
+        else:
+            self.image_format = QImage.Format.Format_ARGB32_Premultiplied
+            self.bytes_per_line = self.width * 4
+        self.slot_count = slot_count
+        self.slot_bytes = self.bytes_per_line * self.height
+        self.table_offset = HEADER_SIZE
+        self.palette_offset = HEADER_SIZE + ((slot_count * TABLE_ENTRY_SIZE + 63) // 64) * 64
+        self.data_offset = self.palette_offset + ((PALETTE_SIZE + 63) // 64) * 64
+        self.file_bytes = self.data_offset + slot_count * self.slot_bytes
+
+        # Slots handed to a compositor job that haven't been committed yet.
+        self.reserved = set()
+
+        # Compositor jobs add colors from pool threads, so the palette is behind a lock.
+        self.palette_lock = threading.Lock()
+
+        # The palette indices each slot's frame uses, None once nothing in the slot is wanted.
+        self.slot_colors = [None] * slot_count
+
+        header = struct.pack(
+            HEADER_FORMAT,
+            MAGIC,
+            VERSION,
+            self.width,
+            self.height,
+            self.bytes_per_line,
+            self.image_format.value,
+            slot_count
+        )
+
+        # Reuse the file if it was written for the same frames, otherwise start it over.
+        reuse = False
+        if os.path.exists(file_path) and os.path.getsize(file_path) == self.file_bytes:
+            with open(file_path, "rb") as file:
+                reuse = file.read(len(header)) == header
+
+        if not reuse:
+            with open(file_path, "wb") as file:
+                file.truncate(self.file_bytes)
+                file.write(header)
+
+        with open(file_path, "r+b") as file:
+            self.map = mmap.mmap(file.fileno(), self.file_bytes)
+
+        # ctypes views into each slot, these are what keep the map alive while QImages point at it.
+        self.slot_buffers = []
+        for slot in range(slot_count):
+            self.slot_buffers.append(ctypes.c_char.from_buffer(self.map, self.getSlotOffset(slot)))
+
+        self.palette_count = struct.unpack_from("<I", self.map, self.palette_offset)[0]
+        self.palette = numpy.ndarray(shape = (PALETTE_COLORS,), dtype = numpy.uint32, buffer = self.map, offset = self.palette_offset + 4)
+        self.palette_map = {}
+        for index in range(self.palette_count):
+            self.palette_map[int(self.palette[index])] = index
+
+        if indexed:
+            for entry in range(slot_count):
+                timestamp, _, slot = self.getEntry(entry)
+                if timestamp != 0 and self.slot_colors[slot] is None:
+                    self.slot_colors[slot] = numpy.unique(self.getSlotRows(slot)[:, :self.width])
+
+    def getSlotOffset(self, slot: int) -> int:
+        return self.data_offset + slot * self.slot_bytes
+
+    def getSlotRows(self, slot: int) -> numpy.ndarray:
+        return numpy.ndarray(shape = (self.height, self.bytes_per_line), dtype = numpy.uint8, buffer = self.map, offset = self.getSlotOffset(slot))
+
+    def getEntry(self, entry: int) -> tuple[int, int, int]:
+        # (timestamp, digest, slot)
+        return struct.unpack_from(TABLE_ENTRY_FORMAT, self.map, self.table_offset + entry * TABLE_ENTRY_SIZE)
+
+    def setEntry(self, entry: int, timestamp: int, digest: int, slot: int):
+        struct.pack_into(TABLE_ENTRY_FORMAT, self.map, self.table_offset + entry * TABLE_ENTRY_SIZE, timestamp, digest, slot)
+
+    def getSlotImage(self, slot: int) -> QImage:
+        pointer = sip.voidptr(ctypes.addressof(self.slot_buffers[slot]))
+        image = QImage(pointer, self.width, self.height, self.bytes_per_line, self.image_format)
+        if self.indexed:
+            image.setColorTable(self.getColorTable())
+        return image
+
+    def getFrame(self, timestamp: int) -> tuple[QImage, int] | None:
+        # (image, digest)
+        for entry in range(self.slot_count):
+            entry_timestamp, digest, slot = self.getEntry(entry)
+            if entry_timestamp == timestamp:
+                return self.getSlotImage(slot), digest
+        return None
+
+    def findDigest(self, digest: int) -> int:
+        # The slot of a frame that looks the same, or -1.
+        for entry in range(self.slot_count):
+            entry_timestamp, entry_digest, slot = self.getEntry(entry)
+            if entry_timestamp != 0 and entry_digest == digest:
+                return slot
+        return -1
+
+    def allocateSlot(self, keep_timestamps: set[int]) -> int:
+        """
+        Picks a slot to paint a new frame into: an unused one, then one only holding frames we no longer want,
+        and as a last resort the one holding the oldest frame.
+        Frames in the slot are dropped right away, so a half written frame is never read back.
+        """
+        kept_slots = set()
+        used_slots = set()
+        oldest_slot = -1
+        oldest_timestamp = 0
+        for entry in range(self.slot_count):
+            timestamp, _, slot = self.getEntry(entry)
+            if timestamp == 0 or slot in self.reserved:
+                continue
+            used_slots.add(slot)
+            if timestamp in keep_timestamps:
+                kept_slots.add(slot)
+            if oldest_slot < 0 or timestamp < oldest_timestamp:
+                oldest_slot = slot
+                oldest_timestamp = timestamp
+
+        free_slots = [slot for slot in range(self.slot_count) if slot not in self.reserved and slot not in used_slots]
+        unwanted_slots = [slot for slot in used_slots if slot not in kept_slots]
+        if len(free_slots) > 0:
+            best_slot = free_slots[0]
+        elif len(unwanted_slots) > 0:
+            best_slot = unwanted_slots[0]
+        else:
+            best_slot = oldest_slot
+
+        for entry in range(self.slot_count):
+            timestamp, _, slot = self.getEntry(entry)
+            if slot == best_slot:
+                self.setEntry(entry, 0, 0, 0)
+        self.reserved.add(best_slot)
+        self.releaseColors(best_slot)
+        return best_slot
+
+    def commitSlot(self, slot: int, timestamp: int, digest: int, keep_timestamps: set[int]):
+        """
+        Records a frame as living in slot, either one we just painted or one a frame that looks the same already lives in.
+        The frame takes an empty entry, or the entry of a frame we no longer want.
+        """
+        self.reserved.discard(slot)
+        best_entry = -1
+        for entry in range(self.slot_count):
+            entry_timestamp, _, _ = self.getEntry(entry)
+            if entry_timestamp == 0:
+                best_entry = entry
+                break
+            if best_entry < 0 and entry_timestamp not in keep_timestamps:
+                best_entry = entry
+
+        if best_entry >= 0:
+            replaced_slot = self.getEntry(best_entry)[2]
+            self.setEntry(best_entry, timestamp, digest, slot)
+            if replaced_slot != slot:
+                self.releaseColors(replaced_slot)
+
+    def releaseSlot(self, slot: int):
+        self.reserved.discard(slot)
+        self.releaseColors(slot)
+
+    def clearTimestamp(self, timestamp: int):
+        for entry in range(self.slot_count):
+            entry_timestamp, _, slot = self.getEntry(entry)
+            if entry_timestamp == timestamp:
+                self.setEntry(entry, 0, 0, 0)
+                self.releaseColors(slot)
+
+    def releaseColors(self, slot: int):
+        # Once no frame lives in a slot, the colors only it used can go to the next frame that needs room.
+        if slot in self.reserved:
+            return
+        for entry in range(self.slot_count):
+            timestamp, _, entry_slot = self.getEntry(entry)
+            if timestamp != 0 and entry_slot == slot:
+                return
+        with self.palette_lock:
+            self.slot_colors[slot] = None
+
+    def reclaimColors(self, slot: int, known: list[int]) -> list[int]:
+        # Palette indices no frame uses anymore, other than the known ones the frame being painted into slot is about to. Called with the lock held.
+        used = numpy.zeros(PALETTE_COLORS, dtype = bool)
+        for colors_slot, colors in enumerate(self.slot_colors):
+            if colors is not None and colors_slot != slot:
+                used[colors] = True
+        used[[index for index in known if index >= 0]] = True
+        free = [index for index in range(self.palette_count) if not used[index]]
+        for index in free:
+            color = int(self.palette[index])
+            if self.palette_map.get(color) == index:
+                del self.palette_map[color]
+        return free
+
+    def getColorTable(self) -> list[int]:
+        # Colors only change once no frame uses them, so a snapshot covers every frame committed before it was taken.
+        with self.palette_lock:
+            return [int(color) for color in self.palette[:self.palette_count]]
+
+    def quantize(self, source: QImage, target: QImage, slot: int) -> bool:
+        """
+        Writes an ARGB32_Premultiplied source into an indexed target, the image of slot, adding any new colors to the shared palette.
+        Every color keeps its exact value, so when the palette can't hold them all nothing is written and False comes back.
+        """
+        source_pixels = ImageUtils.getPixelArray(source)
+        values = source_pixels.view(numpy.uint32)[:, :, 0]
+        colors, inverse = numpy.unique(values, return_inverse = True)
+
+        # Palettes hold plain ARGB32, let Qt do the unpremultiply so converting back is exact.
+        color_image = QImage(len(colors), 1, QImage.Format.Format_ARGB32_Premultiplied)
+        ImageUtils.getPixelArray(color_image).view(numpy.uint32)[0, :, 0] = colors
+        color_image.convertTo(QImage.Format.Format_ARGB32)
+        plain_colors = ImageUtils.getPixelArray(color_image).view(numpy.uint32)[0, :, 0]
+
+        with self.palette_lock:
+            known = [self.palette_map.get(color, -1) for color in plain_colors.tolist()]
+            new_count = known.count(-1)
+            free = list(range(self.palette_count, PALETTE_COLORS))
+            if new_count > len(free):
+                reclaimed = self.reclaimColors(slot, known)
+                Metrics.increment("radar.palette_reclaimed", len(reclaimed))
+                free += reclaimed
+                if new_count > len(free):
+                    return False
+
+            free.reverse()
+            indices = numpy.empty(len(plain_colors), dtype = numpy.uint8)
+            for position, color in enumerate(plain_colors.tolist()):
+                index = known[position]
+                if index < 0:
+                    index = free.pop()
+                    self.palette[index] = color
+                    self.palette_map[color] = index
+                    self.palette_count = max(self.palette_count, index + 1)
+                indices[position] = index
+            struct.pack_into("<I", self.map, self.palette_offset, self.palette_count)
+            # Claimed before the lock goes, so another job making room can't hand these out from under us.
+            self.slot_colors[slot] = indices
+
+        self.getSlotRows(slot)[:, :self.width] = indices[inverse].reshape(self.height, self.width)
+        target.setColorTable(self.getColorTable())
+        return True
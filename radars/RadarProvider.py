@@ -3,14 +3,20 @@ from typing import Callable
 
 from PyQt6.QtCore import QObject
 
-from radars.RadarData import RadarData, SizeData
+from radars.RadarData import RadarFrameRing, SizeData
 
 class RadarProvider(QObject):
+    stagger_ms = 0
 
     @abstractmethod
-    def getRadar(self, on_finished_callback: Callable[[list[RadarData]], None]):
+    def getRadar(self, on_finished_callback: Callable[[RadarFrameRing], None]):
         raise ValueError("RadarProvider.getRadar() not implemented.")
 
     @abstractmethod
     def setSize(self, size_data: SizeData):
-        raise ValueError("RadarProvider.setSize() not implemented.")
\ No newline at end of file
+        raise ValueError("RadarProvider.setSize() not implemented.")
+
+    def setStagger(self, stagger_ms: int):
+        # Radars sharing a server wait this long before fetching new frames' tiles, so they don't all fetch at once.
+        # Their refreshes stay in step, so the manifest check is still one request for all of them.
+        self.stagger_ms = stagger_ms
\ No newline at end of file
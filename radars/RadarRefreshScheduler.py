@@ -0,0 +1,118 @@
+import math
+import statistics
+import time
+from typing import Callable
+
+from PyQt6.QtCore import Qt, QTimer
+
+from MetricsUtils import Metrics
+
+# A frame shows up in the manifest a little while after its timestamp, this is how long we give it.
+PUBLISH_LAG_MS = 45 * 1000
+
+# Never poll more often than this, and when a frame is late, start backing off from here.
+MIN_DELAY_MS = 15 * 1000
+
+# Only the gaps between the most recent frames count, so a change in cadence gets picked up quickly.
+CADENCE_FRAMES = 6
+
+
+class RadarRefreshScheduler:
+    """
+    Decides when a radar should refresh next, from the timestamps of the frames it already has.
+    The cadence is the median gap between recent frames, so the next frame is expected one cadence after the newest,
+    and we refresh shortly after that instead of on a fixed timer.
+    When the expected frame doesn't show up, we back off, doubling the wait each time, up to max_interval_ms.
+    Every radar refreshes on the same schedule, so their manifest checks share one request,
+    and it's the providers that stagger fetching the new frames' tiles.
+    """
+    def __init__(self, max_interval_ms: int, on_refresh: Callable[[], None]):
+        self.max_interval_ms = max(MIN_DELAY_MS, max_interval_ms)
+        self.on_refresh = on_refresh
+        self.cadence_ms = 0
+        self.newest_timestamp = 0
+        self.polled_timestamp = 0
+        # Whether the last refresh went out once the next frame was due, so coming back empty counts as a miss.
+        self.polled_due = False
+        self.misses = 0
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        # Coarse timers can fire a little early, which would poll before the frame is due.
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.refresh)
+
+    def start(self):
+        # The caller has just fetched, so we only need to line up the next one.
+        self.polled_timestamp = self.newest_timestamp
+        self.polled_due = False
+        self.misses = 0
+        self.schedule()
+
+    def stop(self):
+        self.timer.stop()
+
+    def onFrames(self, timestamps: list[int]):
+        """
+        timestamps is ordered oldest (0) to newest (len - 1), like the frames.
+        A new newest frame means the next one is a cadence away, so we line up for it now.
+        """
+        if len(timestamps) == 0:
+            return
+
+        # Frames come in newest first, so the cadence fills in after the newest frame has already landed.
+        changed = False
+        recent = sorted(set(timestamps))[-CADENCE_FRAMES:]
+        if len(recent) > 1:
+            cadence_ms = statistics.median(b - a for a, b in zip(recent, recent[1:])) * 1000
+            changed = cadence_ms != self.cadence_ms
+            self.cadence_ms = cadence_ms
+
+        if recent[-1] > self.newest_timestamp:
+            # Whatever we were waiting on is here, so the wait goes back to a cadence.
+            self.newest_timestamp = recent[-1]
+            self.misses = 0
+            Metrics.setGauge("radar.staleness_secs", self.getStalenessMs() / 1000)
+            changed = True
+
+        if changed and self.timer.isActive():
+            self.schedule()
+
+    def getStalenessMs(self) -> float:
+        return (time.time() - self.newest_timestamp) * 1000
+
+    def refresh(self):
+        # A refresh's frames land after it returns, so it's only now we know whether the last one found anything.
+        # It only missed if the frame was due by then, an early refresh isn't expected to find one.
+        if self.polled_due and self.newest_timestamp == self.polled_timestamp:
+            self.misses += 1
+            Metrics.increment("radar.refresh_misses")
+        self.polled_timestamp = self.newest_timestamp
+        self.polled_due = self.cadence_ms > 0 and self.newest_timestamp > 0 and self.getDueMs() <= 0
+        if self.newest_timestamp > 0:
+            Metrics.setGauge("radar.staleness_secs", self.getStalenessMs() / 1000)
+
+        if callable(self.on_refresh):
+            self.on_refresh()
+        self.schedule()
+
+    def getDelayMs(self) -> int:
+        if self.cadence_ms <= 0 or self.newest_timestamp == 0:
+            return self.max_interval_ms
+
+        # Until the next frame is due, wait for it. After that, back off until it shows up.
+        due_ms = self.getDueMs()
+        if due_ms > 0 and self.misses == 0:
+            delay_ms = due_ms
+        else:
+            delay_ms = MIN_DELAY_MS * 2 ** min(self.misses, 8)
+        # Rounded up, so a refresh for a due frame never goes out a fraction of a millisecond before it's due.
+        return math.ceil(min(self.max_interval_ms, max(MIN_DELAY_MS, delay_ms)))
+
+    def getDueMs(self) -> float:
+        # How long until the next frame should be in the manifest, negative once it's overdue.
+        return self.newest_timestamp * 1000 + self.cadence_ms + PUBLISH_LAG_MS - time.time() * 1000
+
+    def schedule(self):
+        delay_ms = self.getDelayMs()
+        Metrics.setGauge("radar.refresh_delay_secs", delay_ms / 1000)
+        self.timer.start(delay_ms)
\ No newline at end of file
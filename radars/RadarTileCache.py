@@ -0,0 +1,136 @@
+import hashlib
+from collections import OrderedDict
+
+from PyQt6.QtCore import QByteArray
+from PyQt6.QtGui import QImage
+
+from MetricsUtils import Metrics
+from assets.AssetUtils import AssetUtils
+from assets.CacheManager import CacheManager
+from assets.ImageUtils import ImageUtils
+
+# Stands in for every fully transparent tile, so those never get decoded twice or painted at all.
+EMPTY_TILE = QImage(1, 1, QImage.Format.Format_ARGB32)
+EMPTY_TILE.fill(0)
+
+
+class RadarTileCache:
+    """
+    One tile cache for the whole process, so every radar provider shares the tiles it has already pulled.
+    Tiles are keyed by (frame path, tile size, zoom, x, y, color, smoothing, snow).
+    Decoded tiles live in memory under an LRU byte budget, and the encoded tiles go to disk so a restart can reuse them.
+    Every tile is fingerprinted by its encoded bytes. Fully transparent tiles come back as EMPTY_TILE,
+    and once we've seen an empty tile's bytes, the same bytes are known empty without decoding them.
+    """
+    instance = None
+
+    @staticmethod
+    def getCache(memory_budget_mb: int = 32):
+        if RadarTileCache.instance is None:
+            RadarTileCache.instance = RadarTileCache(memory_budget_mb * 1024 * 1024)
+        return RadarTileCache.instance
+
+    @staticmethod
+    def getKeyName(key: tuple) -> str:
+        return hashlib.sha1("_".join(str(part) for part in key).encode("utf-8")).hexdigest()
+
+    def __init__(self, memory_budget_bytes: int):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.memory_bytes = 0
+        self.images = OrderedDict()
+        self.digests = {}
+        self.empty_digests = set()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> QImage | None:
+        image = self.images.get(key)
+        if image is not None:
+            self.images.move_to_end(key)
+            self.memory_hits += 1
+            Metrics.increment("radar.tile_cache.memory_hits")
+            return image
+
+        tile_file = AssetUtils.getCachedRadarTileFile(RadarTileCache.getKeyName(key))
+        if CacheManager.getManager().has(tile_file):
+            with open(tile_file, "rb") as file:
+                tile_bytes = file.read()
+            image = self.decode(key, tile_bytes)
+            if not image.isNull():
+                self.disk_hits += 1
+                Metrics.increment("radar.tile_cache.disk_hits")
+                self.remember(key, image)
+                return image
+
+        self.misses += 1
+        Metrics.increment("radar.tile_cache.misses")
+        return None
+
+    def getVariant(self, key: tuple) -> QImage | None:
+        # Variants of a tile, like recolored ones, only live in memory since they are cheap to make again.
+        image = self.images.get(key)
+        if image is not None:
+            self.images.move_to_end(key)
+        return image
+
+    def put(self, key: tuple, tile_bytes: QByteArray) -> QImage:
+        image = self.decode(key, tile_bytes.data())
+        if image.isNull():
+            return image
+
+        tile_file = AssetUtils.getCachedRadarTileFile(RadarTileCache.getKeyName(key))
+        with open(tile_file, "wb") as file:
+            file.write(tile_bytes.data())
+        CacheManager.getManager().add(tile_file, "/".join(str(part) for part in key))
+
+        self.remember(key, image)
+        return image
+
+    def decode(self, key: tuple, tile_bytes: bytes) -> QImage:
+        digest = hashlib.sha1(tile_bytes).digest()
+        if digest in self.empty_digests:
+            Metrics.increment("radar.tile_cache.empty_skipped")
+            self.digests[key] = digest
+            return EMPTY_TILE
+
+        image = QImage()
+        image.loadFromData(tile_bytes)
+        if image.isNull():
+            return image
+
+        self.digests[key] = digest
+        if ImageUtils.isTransparent(image):
+            self.empty_digests.add(digest)
+            return EMPTY_TILE
+        return image
+
+    def getDigest(self, key: tuple) -> bytes:
+        # Only good right after a get() or put() for the same key.
+        return self.digests.get(key, b"")
+
+    def remove(self, key: tuple):
+        self.digests.pop(key, None)
+        image = self.images.pop(key, None)
+        if image is not None:
+            self.memory_bytes -= image.sizeInBytes()
+            Metrics.setGauge("radar.tile_cache.memory_bytes", self.memory_bytes)
+
+        CacheManager.getManager().remove(AssetUtils.getCachedRadarTileFile(RadarTileCache.getKeyName(key)))
+
+    def remember(self, key: tuple, image: QImage):
+        if key in self.images:
+            self.memory_bytes -= self.images.pop(key).sizeInBytes()
+        self.images[key] = image
+        self.memory_bytes += image.sizeInBytes()
+
+        # Drop the least recently used tiles until we are back under budget.
+        while self.memory_bytes > self.memory_budget_bytes and len(self.images) > 1:
+            old_key, old_image = self.images.popitem(last = False)
+            self.digests.pop(old_key, None)
+            self.memory_bytes -= old_image.sizeInBytes()
+
+        Metrics.setGauge("radar.tile_cache.memory_bytes", self.memory_bytes)
+
+    def __str__(self):
+        return f"RadarTileCache: memory hits: {self.memory_hits}, disk hits: {self.disk_hits}, misses: {self.misses}, tiles: {len(self.images)}, bytes: {self.memory_bytes}"
@@ -0,0 +1,137 @@
+import random
+from typing import Callable
+
+from PyQt6.QtCore import QByteArray, QObject, QTimer, QUrl
+from PyQt6.QtNetwork import QNetworkReply, QNetworkRequest
+
+from MetricsUtils import Metrics
+from NetworkUtils import NetworkService, Priority
+
+# The first retry waits about this long, and every retry after that twice as long, up to the cap.
+RETRY_BASE_MS = 1000
+RETRY_CAP_MS = 30000
+
+
+class TileRequest:
+    def __init__(self, timestamp: int, index: int, url: str, key: tuple):
+        self.timestamp = timestamp
+        self.index = index
+        self.url = url
+        self.key = key
+        self.attempts = 0
+        # Cleared when the tile fails for good in a way asking again won't fix, like a 404.
+        self.retryable = True
+
+    def getHost(self) -> str:
+        return QUrl(self.url).host()
+
+
+class RadarTileFetcher(QObject):
+    """
+    Hands tile requests to the shared NetworkService, which keeps up to max_per_host of them in flight at once.
+    Tiles go out at low priority and in the order they were added, so weather and manifests never wait behind a loop of tiles.
+    Every finished tile's encoded bytes are handed back through on_tile, in whatever order the replies arrive.
+    A tile that makes no progress for timeout_ms gets dropped, and failed tiles are tried again up to max_retries times,
+    backing off with some jitter so a flaky server doesn't get every tile at once. A tile that still fails comes back empty.
+    Whenever nothing of ours is queued, in flight or waiting to be retried, on_done fires.
+    """
+    def __init__(
+            self,
+            max_per_host: int,
+            on_tile: Callable[[TileRequest, QByteArray], None],
+            on_done: Callable[[], None],
+            timeout_ms: int = 10000,
+            max_retries: int = 3
+    ):
+        super().__init__()
+        self.network = NetworkService.getService()
+        self.max_per_host = max(1, max_per_host)
+        self.on_tile = on_tile
+        self.on_done = on_done
+        self.timeout_ms = timeout_ms
+        self.max_retries = max_retries
+        # Tiles waiting on a retry are in here too, with no request data.
+        self.pending = {}
+
+    def add(self, tile_requests: list[TileRequest]):
+        # New work goes behind whatever is already queued, nothing in flight gets dropped.
+        for tile_request in tile_requests:
+            self.network.setHostLimit(tile_request.getHost(), self.max_per_host)
+            self.send(tile_request)
+        self.checkDone()
+
+    def send(self, tile_request: TileRequest):
+        tile_request.attempts += 1
+        request = QNetworkRequest(QUrl(tile_request.url))
+        request.setTransferTimeout(self.timeout_ms)
+        self.pending[tile_request] = self.network.get(request, lambda reply, r = tile_request: self.onReply(r, reply), Priority.LOW)
+
+    def cancel(self, timestamp: int):
+        # Drop every tile for a frame we no longer want, queued, in flight or waiting on a retry.
+        for tile_request, request_data in list(self.pending.items()):
+            if tile_request.timestamp == timestamp:
+                if request_data is not None:
+                    self.network.cancel(request_data)
+                del self.pending[tile_request]
+
+    def abort(self):
+        for request_data in self.pending.values():
+            if request_data is not None:
+                self.network.cancel(request_data)
+        self.pending = {}
+
+    def isBusy(self) -> bool:
+        return len(self.pending) > 0
+
+    def onReply(self, tile_request: TileRequest, reply: QNetworkReply):
+        tile_bytes = QByteArray()
+        if reply.error() == QNetworkReply.NetworkError.NoError:
+            tile_bytes = reply.readAll()
+        else:
+            if reply.error() == QNetworkReply.NetworkError.OperationCanceledError:
+                # Only the transfer timeout cancels our requests, a cancel() never calls back.
+                Metrics.increment("radar.tile_timeouts")
+            if tile_request.attempts <= self.max_retries and RadarTileFetcher.canRetry(reply):
+                self.retryLater(tile_request)
+                return
+            print(f"RadarTileFetcher.onReply(): {reply.errorString()} for {tile_request.url}, giving up after {tile_request.attempts} tries")
+            Metrics.increment("radar.tile_failures")
+            tile_request.retryable = RadarTileFetcher.canRetry(reply)
+
+        self.pending.pop(tile_request, None)
+
+        if callable(self.on_tile):
+            self.on_tile(tile_request, tile_bytes)
+
+        self.checkDone()
+
+    @staticmethod
+    def canRetry(reply: QNetworkReply) -> bool:
+        # A tile the server says isn't there won't show up by asking again, but busy or broken servers might recover.
+        status = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+        if status is None:
+            return True
+        return status == 429 or status >= 500
+
+    @staticmethod
+    def getRetryDelayMs(attempts: int) -> int:
+        backoff_ms = min(RETRY_CAP_MS, RETRY_BASE_MS * 2 ** (attempts - 1))
+        return int(backoff_ms * random.uniform(0.5, 1.0))
+
+    def retryLater(self, tile_request: TileRequest):
+        delay_ms = RadarTileFetcher.getRetryDelayMs(tile_request.attempts)
+        Metrics.increment("radar.tile_retries")
+
+        # It stays pending while it waits, so on_done doesn't fire early.
+        self.pending[tile_request] = None
+        QTimer.singleShot(delay_ms, lambda: self.retry(tile_request))
+
+    def retry(self, tile_request: TileRequest):
+        # Cancelled or aborted while it was waiting.
+        if tile_request not in self.pending:
+            return
+        self.send(tile_request)
+
+    def checkDone(self):
+        if not self.isBusy() and callable(self.on_done):
+            self.on_done()
@@ -0,0 +1,138 @@
+import json
+from typing import Callable
+
+from PyQt6.QtCore import QObject, QTimer, QUrl
+from PyQt6.QtNetwork import QNetworkReply, QNetworkRequest
+
+from MetricsUtils import Metrics
+from NetworkUtils import NetworkService, Priority
+from radars.RadarData import TilePathData
+from radars.RadarTileFetcher import RadarTileFetcher
+
+MANIFEST_URL = "https://api.rainviewer.com/public/weather-maps.json"
+
+# A request that has been out longer than this is taken as lost, so it gets dropped and sent again.
+REQUEST_DEADLINE_MS = 60 * 1000
+
+# Radars refresh on the same schedule, but not on the same millisecond, so a reply this recent answers them all.
+FRESH_MS = 10 * 1000
+
+
+class RainViewerManifest(QObject):
+    """
+    One weather-maps.json fetcher for the whole process.
+    Every RainViewer provider subscribes here, and a refresh from any of them pushes the new frames to all of them.
+    We send If-None-Match/If-Modified-Since, so when RainViewer hasn't published anything new we get a 304,
+    skip parsing, and nobody downstream does any work.
+    Failures a retry might fix get retried with the same backoff as tiles, for as long as it takes,
+    so an outage doesn't leave the radars waiting on their next scheduled refresh.
+    """
+    instance = None
+
+    @staticmethod
+    def getManifest():
+        if RainViewerManifest.instance is None:
+            RainViewerManifest.instance = RainViewerManifest()
+        return RainViewerManifest.instance
+
+    def __init__(self):
+        super().__init__()
+        self.network = NetworkService.getService()
+        self.request_data = None
+        self.etag = None
+        self.last_modified = None
+        self.subscribers = []
+        self.attempts = 0
+        self.replied_at = None
+        self.retry_timer = QTimer()
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self.refresh)
+
+        # The last manifest we parsed, oldest (0) to newest (len - 1).
+        self.host = ""
+        self.tile_path_list = []
+
+    def subscribe(self, callback: Callable[[str, list[TilePathData]], None]):
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+
+    def hasManifest(self) -> bool:
+        return self.host != ""
+
+    def isPending(self) -> bool:
+        # A request is out, or one is waiting to be retried.
+        return self.request_data is not None or self.retry_timer.isActive()
+
+    def isOverdue(self) -> bool:
+        return self.request_data is not None and Metrics.elapsedMs(self.request_data.queued_at) >= REQUEST_DEADLINE_MS
+
+    def refresh(self):
+        # If a request is already out, whoever asked will get the push when it lands.
+        # Unless it has been out so long that it never will, then it gets replaced.
+        if self.request_data is not None:
+            if not self.isOverdue():
+                Metrics.increment("radar.manifest.coalesced")
+                return
+            print(f"RainViewerManifest.refresh(): No reply in {Metrics.elapsedMs(self.request_data.queued_at):.0f}ms, sending the request again")
+            Metrics.increment("radar.manifest.abandoned")
+            self.network.cancel(self.request_data)
+            self.request_data = None
+
+        # Everyone subscribed already got whatever that reply had to say.
+        if self.replied_at is not None and Metrics.elapsedMs(self.replied_at) < FRESH_MS:
+            Metrics.increment("radar.manifest.coalesced")
+            return
+
+        # Asking now beats waiting out a retry.
+        self.retry_timer.stop()
+
+        request = QNetworkRequest(QUrl(MANIFEST_URL))
+        if self.etag is not None:
+            request.setRawHeader(b"If-None-Match", self.etag)
+        if self.last_modified is not None:
+            request.setRawHeader(b"If-Modified-Since", self.last_modified)
+        self.request_data = self.network.get(request, self.onManifest, Priority.HIGH)
+
+    def onManifest(self, reply: QNetworkReply):
+        self.request_data = None
+
+        if reply.error() != QNetworkReply.NetworkError.NoError:
+            Metrics.increment("radar.manifest.errors")
+            if RadarTileFetcher.canRetry(reply):
+                self.attempts += 1
+                delay_ms = RadarTileFetcher.getRetryDelayMs(self.attempts)
+                print(f"RainViewerManifest.onManifest(): {reply.errorString()}, trying again in {delay_ms}ms")
+                Metrics.increment("radar.manifest.retries")
+                self.retry_timer.start(delay_ms)
+                return
+            print(f"RainViewerManifest.onManifest(): {reply.errorString()}")
+            return
+        self.attempts = 0
+        self.replied_at = Metrics.now()
+
+        status = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+        if status == 304:
+            Metrics.increment("radar.manifest.not_modified")
+            return
+
+        json_bytes = reply.readAll()
+        json_string = json_bytes.data().decode("utf-8")
+        if json_string == "":
+            print(f"JSON string is empty for Rain Viewer timestamp reply: {reply.url()}")
+            return
+        json_obj = json.loads(json_string)
+        Metrics.increment("radar.manifest.fetched")
+
+        if reply.hasRawHeader(b"ETag"):
+            self.etag = reply.rawHeader(b"ETag").data()
+        if reply.hasRawHeader(b"Last-Modified"):
+            self.last_modified = reply.rawHeader(b"Last-Modified").data()
+
+        # The timestamps in the reply JSON are ordered oldest (0) to newest (len - 1).
+        self.host = json_obj["host"]
+        self.tile_path_list = []
+        for item in json_obj["radar"]["past"]:
+            self.tile_path_list.append(TilePathData(item["time"], item["path"]))
+
+        for callback in self.subscribers:
+            callback(self.host, self.tile_path_list)
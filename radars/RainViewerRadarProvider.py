@@ -1,17 +1,25 @@
-import json
-import os
-
-from datetime import datetime
-from PyQt6.QtCore import QSize, QUrl, QFile
-from PyQt6.QtGui import QColor, QFont, QImage, QPainter, QPixmap
-from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+import time
+from PyQt6.QtCore import QByteArray, QSize, QThreadPool, QTimer
+from PyQt6.QtGui import QImage
 from typing import Callable
 
+from MetricsUtils import Metrics
 from assets.AssetUtils import AssetUtils
+from assets.CacheManager import CacheManager
 from configs.ConfigUtils import Config
 from radars.MercatorProjection import LatLng, Utils
-from radars.RadarData import RadarData, TilePathData, TileUrlsData, SizeData
+from radars.RadarColorTable import CANONICAL_SCHEME, RadarColorTable
+from radars.RadarCompositor import CompositeData, RadarCompositeJob, RadarCompositorSignals
+from radars.RadarData import FrameTilesData, RadarData, RadarFrameRing, TilePathData, TileUrlsData, SizeData
+from radars.RadarFramePlanner import RadarFramePlanner
+from radars.RadarFrameStore import RadarFrameStore
 from radars.RadarProvider import RadarProvider
+from radars.RadarTileCache import EMPTY_TILE, RadarTileCache
+from radars.RadarTileFetcher import RadarTileFetcher, TileRequest
+from radars.RainViewerManifest import RainViewerManifest
+
+# How long to wait before going back for the tiles a partial frame is missing.
+PARTIAL_RETRY_MS = 60 * 1000
 
 class RainViewerRadarProvider(RadarProvider):
     def __init__(self, config: Config):
@@ -21,261 +29,440 @@ class RainViewerRadarProvider(RadarProvider):
         location = config.app_settings.location
         self.latitude = location.latitude
         self.longitude = location.longitude
-        self.app_color = config.app_settings.color.rgba
+        self.app_color = config.app_settings.color
         self.radar_color = config.wx_settings.radar_color
         self.radar_snow = 1 if config.wx_settings.radar_snow else 0
         self.radar_smoothing = 1 if config.wx_settings.radar_smoothing else 0
         self.frame_count = 10  # Number of radar images to hold onto.
-        self.net_man = QNetworkAccessManager(self)
+        self.export_png = config.wx_settings.radar_export_png
+        self.indexed = config.wx_settings.radar_indexed
+        self.recolor = config.wx_settings.radar_recolor
+        self.app_color_ramp = config.wx_settings.radar_app_color_ramp
+        self.stall_ms = config.wx_settings.radar_stall_secs * 1000
+        self.tile_fetcher = RadarTileFetcher(
+            config.wx_settings.radar_max_requests,
+            self.onTile,
+            self.onTilesDone,
+            config.wx_settings.radar_tile_timeout * 1000,
+            config.wx_settings.radar_tile_retries
+        )
+        self.tile_cache = RadarTileCache.getCache(config.wx_settings.radar_tile_cache_mb)
+        self.manifest = RainViewerManifest.getManifest()
+        self.manifest.subscribe(self.onManifest)
+        self.thread_pool = QThreadPool.globalInstance()
+        self.compositor_signals = RadarCompositorSignals()
+        self.compositor_signals.finished.connect(self.onComposited)
+        self.retry_timer = QTimer()
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self.getTiles)
+        self.watchdog_timer = QTimer()
+        self.watchdog_timer.timeout.connect(self.checkStalled)
+        self.stagger_timer = QTimer()
+        self.stagger_timer.setSingleShot(True)
+        self.stagger_timer.timeout.connect(self.getTiles)
 
         # Things we will get or build later.
         self.callback = None
-        self.current_timestamp_index = 0
-        self.current_url_index = 0
-        self.reply = None
+        self.needs_planning = True
         self.rect_size = QSize(0,0)
-        self.radar_data_list = []
-        self.tile_image_list = []
-        self.tile_urls_data_list = []
-        self.tile_path_list = []
-        self.timestamp_list = []
+        self.radar_data_list = RadarFrameRing(self.frame_count)
+        self.frame_tiles_map = {}
+        self.refresh_start = 0.0
+        self.refresh_tile_count = 0
+        self.generation = 0
+        self.pending_jobs = 0
+        self.tiles_done = False
+        self.first_frame_start = None
+        self.last_progress = 0.0
+        self.frame_planner = RadarFramePlanner(self.frame_count, self.radar_color, self.radar_smoothing, self.radar_snow)
+        self.frame_store = None
+        self.color_name = self.getColorName()
+        self.color_lut = None
+        if self.recolor:
+            # Tiles come down in the canonical scheme, and get colored here once the color table is in.
+            self.frame_planner.radar_color = CANONICAL_SCHEME
+            self.color_table = RadarColorTable.getTable()
+            self.color_table.subscribe(self.onColorTable)
         self.zoom = 10
+        self.tile_size = Utils.MERCATOR_RANGE
 
-        # Stuff for combining the tiles into a single image.
-        self.corner_tiles = {}
-        self.tiles_width = 0
-        self.total_width = 0
-        self.x_list = []
-        self.tiles_height = 0
-        self.total_height = 0
-        self.y_list = []
+        # Which tiles are behind our view and where they go, for combining the tiles into a single image.
+        self.viewport = None
 
     def setSize(self, size_data: SizeData):
         self.zoom = size_data.zoom
         self.rect_size = size_data.size
-        corners = Utils.getCorners(
+        self.tile_size = size_data.tile_size
+        self.needs_planning = True
+
+        # Anything planned, fetched or being composited for the old size is no good to us now.
+        self.generation += 1
+        self.pending_jobs = 0
+        self.first_frame_start = None
+        self.tile_fetcher.abort()
+        self.frame_tiles_map = {}
+        self.radar_data_list = RadarFrameRing(self.frame_count)
+
+        self.viewport = Utils.getViewport(
             LatLng(self.latitude, self.longitude),
             self.zoom,
             self.rect_size.width(),
-            self.rect_size.height()
+            self.rect_size.height(),
+            self.tile_size
         )
-        self.corner_tiles = {
-            "NW": Utils.getTileXY(LatLng(corners["N"], corners["W"]), self.zoom),
-            "NE": Utils.getTileXY(LatLng(corners["N"], corners["E"]), self.zoom),
-            "SE": Utils.getTileXY(LatLng(corners["S"], corners["E"]), self.zoom),
-            "SW": Utils.getTileXY(LatLng(corners["S"], corners["W"]), self.zoom)
-        }
-
-        for y in range(int(self.corner_tiles["NW"]["Y"]), int(self.corner_tiles["SW"]["Y"]) + 1):
-            self.y_list.append(y)
-            self.total_height += 256
-            self.tiles_height += 1
-
-        for x in range(int(self.corner_tiles["NW"]["X"]), int(self.corner_tiles["NE"]["X"]) + 1):
-            self.x_list.append(x)
-            self.total_width += 256
-            self.tiles_width += 1
-
-    def getRadar(self, callback: Callable[[list[RadarData]], None]):
+        self.frame_planner.setGrid(self.viewport.tile_zoom, self.viewport.x_list, self.viewport.y_list, self.tile_size)
+
+        # Room for every frame we keep, plus a couple being composited while the oldest are still on screen.
+        store_file = AssetUtils.getRadarFrameStoreFile(self.latitude, self.longitude, self.zoom, self.rect_size, self.color_name, self.tile_size)
+        self.frame_store = RadarFrameStore(store_file, self.rect_size, self.frame_count + 2, self.indexed)
+        CacheManager.getManager().add(store_file, "rainviewer")
+
+    def getRadar(self, callback: Callable[[RadarFrameRing], None]):
         """
         For RainVeiwer, we need to kick of a series of things before we can return the radar images.
-        So here we will grab a main json file to get valid timestamps.
+        So here we ask the shared manifest to refresh, which pushes valid timestamps to onManifest().
         Then we kick it to a function that will build all the required tile urls.
         Then we cycle over them and build our radar images.
         Once they are all done we finally can return the radar images.
         We need to cache timestamps though so we don't re pull images every time we refresh.
         """
         self.callback = callback
-        url = "https://api.rainviewer.com/public/weather-maps.json"
-        request = QNetworkRequest(QUrl(url))
-        self.reply = self.net_man.get(request)
-        self.reply.finished.connect(self.onTimestamps)
-
-    def onTimestamps(self):
-        if self.reply.error() == QNetworkReply.NetworkError.NoError:
-            json_bytes = self.reply.readAll()
-            json_string = json_bytes.data().decode("utf-8")
-            if json_string == "":
-                print(f"JSON string is empty for Rain Viewer timestamp reply: {self.reply.url()}")
-                return
-            json_obj = json.loads(json_string)
-
-            host = json_obj["host"]
-
-            # The timestamps in the reply JSON are ordered oldest (0) to newest (len - 1).
-            # We want the out data lists to also be ordered oldest (0) to newest (len - 1).
-            # That way they can animate in order.
-            item_list = json_obj["radar"]["past"]
-
-            # Grab the list length so we know where to start inserting new items to.
-            insert_index = len(self.tile_path_list)
-            added_item = False
-            # We reverse the list, so that we can grab the newest items first.
-            for item in reversed(item_list):
-                item_timestamp = item["time"]
-                item_path = item["path"]
-
-                # We only need to add items to our list if the newest items aren't in the list.
-                if item_timestamp not in self.timestamp_list:
-                    tile_path_data = TilePathData(item_timestamp, item_path)
-                    self.timestamp_list.insert(insert_index, item_timestamp)
-                    self.tile_path_list.insert(insert_index, tile_path_data)
-
-                    if insert_index > 0:
-                        insert_index -= 1
-
-                else:
-                    break
-
-            # Sort the things and then prune off any older entries.
-            # We can also prune old cache images.
-            self.timestamp_list.sort()
-            self.tile_path_list.sort()
-            while len(self.timestamp_list) > self.frame_count:
-                timestamp = self.timestamp_list.pop(0)
-                self.tile_path_list.pop(0)
-                radar_file_name = AssetUtils.getCachedRadarFile(timestamp, self.latitude, self.longitude, self.zoom, self.rect_size)
-                if os.path.exists(radar_file_name):
-                    os.remove(radar_file_name)
-
-            # Now we can build all the actual urls we need.
-            for item in self.tile_path_list:
-                url_list = []
-                for y in self.y_list:
-                    for x in self.x_list:
-                        url = f"{host}{item.path}/{Utils.MERCATOR_RANGE}/"
-                        url += f"{self.zoom}/{x}/{y}/{self.radar_color}/{self.radar_smoothing}_{self.radar_snow}.png"
-
-                        url_list.append(url)
-
-                entry = TileUrlsData(item.timestamp, url_list)
-                self.tile_urls_data_list.append(entry)
-
-            # Sort the thing and then prune off any older entries.
-            self.tile_urls_data_list.sort()
-            while len(self.tile_urls_data_list) > self.frame_count:
-                self.tile_urls_data_list.pop(0)
-
-            self.getTilesForTimestamps(0, 0)
-
-    def getTilesForTimestamps(
-            self,
-            timestamp_index: int,
-            tile_url_index: int
-    ):
-        self.timestamp_index = timestamp_index
-        self.tile_url_index = tile_url_index
-
-        # If we are over out timestamp list length, we have all the things, and we can finally kick it back.
-        if self.timestamp_index >= len(self.timestamp_list):
-            # Sort it because I was too lazy to ensure things were added in order.
-            self.radar_data_list.sort()
-            while len(self.radar_data_list) > self.frame_count:
-                self.radar_data_list.pop(0)
-
-            if callable(self.callback):
-                self.callback(self.radar_data_list)
-                self.callback = None
-
-            else:
-                print(f"OpenWeatherProvider.currentConditionsCallback(): Bad callback = {self.callback}")
-
+        if len(self.radar_data_list) == 0 and self.first_frame_start is None:
+            self.first_frame_start = Metrics.now()
+
+        if self.recolor and self.color_lut is None:
+            self.color_table.load()
+
+        # If our size changed we can plan from the manifest we already have,
+        # since an unchanged manifest won't get pushed to us again.
+        if self.needs_planning and self.manifest.hasManifest():
+            self.onManifest(self.manifest.host, self.manifest.tile_path_list)
+
+        # Even with nothing new to paint, the store is in use for as long as we're showing it.
+        CacheManager.getManager().touch(self.frame_store.file_path)
+        self.manifest.refresh()
+        # The watchdog looks after the manifest too, in case its reply never shows up.
+        self.startWatchdog()
+
+    def onManifest(self, host: str, item_list: list[TilePathData]):
+        if self.rect_size.isEmpty():
+            # We haven't been sized yet, getRadar() will plan once we have been.
+            return
+        if self.recolor and self.color_lut is None:
+            # We can't color anything yet, onColorTable() will plan once we can.
+            self.needs_planning = True
+            return
+        self.needs_planning = False
+
+        # Only newly published frames get planned, and anything that fell off the end gets dropped.
+        newest_planned = max(self.getPlannedTimestamps(), default = 0)
+        added, expired = self.frame_planner.update(host, item_list)
+        for entry in expired:
+            self.dropFrame(entry)
+
+        # How late we see a frame only means something for frames published since we last looked,
+        # not for the history we plan on a first fill or after a resize.
+        if newest_planned > 0 and len(added) > 0 and added[0].timestamp > newest_planned:
+            Metrics.recordTiming("radar.staleness", (time.time() - added[0].timestamp) * 1000)
+
+        if len(added) > 0 or len(expired) > 0:
+            print(f"RainViewerRadarProvider.onManifest(): {len(added)} new frames, {len(expired)} expired frames")
+
+        # Once we have something on screen, new frames can wait their turn behind the other radars.
+        if len(added) > 0 and len(self.radar_data_list) > 0 and self.stagger_ms > 0:
+            self.stagger_timer.start(self.stagger_ms)
+            return
+        self.getTiles()
+
+    def getColorName(self) -> str:
+        if self.recolor and self.app_color_ramp:
+            color = f"app{self.app_color.hex_value}"
         else:
-            # Otherwise we walk through our entry list to fetch build the tile images.
-            entry = self.tile_urls_data_list[self.timestamp_index]
-
-            # We can skip entries whose timestamps already exist in our radar_data_list.
-            skip_entry = False
-            for radar_data in self.radar_data_list:
-                if radar_data.timestamp == entry.timestamp:
+            color = f"{self.radar_color}"
+        return f"{color}_{self.radar_smoothing}_{self.radar_snow}"
+
+    def onColorTable(self, has_table: bool):
+        if not self.recolor or self.color_lut is not None:
+            return
+
+        if has_table and self.app_color_ramp:
+            self.color_lut = self.color_table.getRampLut(self.app_color.rgba)
+        elif has_table:
+            self.color_lut = self.color_table.getSchemeLut(self.radar_color)
+
+        if self.color_lut is None:
+            print(f"RainViewerRadarProvider.onColorTable(): No color table for scheme {self.radar_color}, fetching tiles already colored")
+            self.useServerColors()
+
+        if self.needs_planning and self.manifest.hasManifest():
+            self.onManifest(self.manifest.host, self.manifest.tile_path_list)
+
+    def useServerColors(self):
+        # Go back to having RainViewer color the tiles, everything planned for canonical tiles starts over.
+        self.recolor = False
+        self.frame_planner.radar_color = self.radar_color
+        self.color_name = self.getColorName()
+        if not self.rect_size.isEmpty():
+            self.setSize(SizeData(self.zoom, self.rect_size, self.tile_size))
+
+    def recolorTile(self, frame_tiles: FrameTilesData, index: int, key: tuple, tile_image: QImage) -> QImage:
+        """
+        Canonical tiles are shared by every radar, and each color of them is kept in the tile cache next to them.
+        A color we don't have yet gets made by the composite job, so here it's only ever a lookup.
+        """
+        if not self.recolor or tile_image is EMPTY_TILE or tile_image.isNull():
+            return tile_image
+
+        variant_key = key + (self.color_name,)
+        recolored_image = self.tile_cache.getVariant(variant_key)
+        if recolored_image is not None:
+            return recolored_image
+        frame_tiles.recolor_keys[index] = variant_key
+        return tile_image
+
+    def dropFrame(self, entry: TileUrlsData):
+        self.tile_fetcher.cancel(entry.timestamp)
+        self.frame_tiles_map.pop(entry.timestamp, None)
+        self.radar_data_list.remove(entry.timestamp)
+
+        self.frame_store.clearTimestamp(entry.timestamp)
+        if self.export_png:
+            CacheManager.getManager().remove(AssetUtils.getCachedRadarFile(entry.timestamp, self.latitude, self.longitude, self.zoom, self.rect_size))
+
+        for key in entry.keys:
+            self.tile_cache.remove(key)
+            if self.recolor:
+                self.tile_cache.remove(key + (self.color_name,))
+
+    def getTiles(self):
+        """
+        Queue up every tile of every planned frame we don't already have, and let the fetcher keep a handful in flight.
+        Frames are queued newest first, so the newest one is on screen as soon as possible and the history fills in behind it.
+        Tiles land in their grid slot as they arrive, and a frame gets combined as soon as its last tile shows up.
+        """
+        if not self.tile_fetcher.isBusy():
+            self.refresh_start = Metrics.now()
+            self.refresh_tile_count = 0
+        self.tiles_done = False
+        self.last_progress = Metrics.now()
+        tile_requests = []
+        for entry in self.frame_planner.getFrames():
+            # We can skip entries we already have, or are already working on.
+            skip_entry = entry.timestamp in self.frame_tiles_map or self.radar_data_list.hasTimestamp(entry.timestamp)
+
+            # A frame a previous run left in the store is used right where it sits, no decoding needed.
+            if not skip_entry:
+                stored_frame = self.frame_store.getFrame(entry.timestamp)
+                if stored_frame is not None:
+                    radar_image, digest = stored_frame
+                    CacheManager.getManager().touch(self.frame_store.file_path)
+                    self.addFrame(RadarData(entry.timestamp, "", radar_image, self.frame_store, digest))
                     skip_entry = True
-                    break
-
-            radar_file_name = AssetUtils.getCachedRadarFile(entry.timestamp, self.latitude, self.longitude, self.zoom, self.rect_size)
-            if not skip_entry and os.path.exists(radar_file_name):
-                radar_data = RadarData(entry.timestamp, radar_file_name)
-                self.radar_data_list.append(radar_data)
-                skip_entry = True
 
             if skip_entry:
-                # We already have this image, so we don't need to re pull it.
-                # DEBUGGING
-                print(f"skipping radar pull for {entry.timestamp}")
-                self.getTilesForTimestamps(self.timestamp_index + 1, 0)
+                continue
+
+            frame_tiles = FrameTilesData(entry.timestamp, len(entry.urls))
+            self.frame_tiles_map[entry.timestamp] = frame_tiles
+            for index, url in enumerate(entry.urls):
+                # Any tile another widget, or a previous run, already pulled comes straight from the cache.
+                tile_image = self.tile_cache.get(entry.keys[index])
+                if tile_image is not None:
+                    tile_digest = self.tile_cache.getDigest(entry.keys[index])
+                    self.setTileImage(frame_tiles, index, self.recolorTile(frame_tiles, index, entry.keys[index], tile_image), tile_digest)
+                else:
+                    tile_requests.append(TileRequest(entry.timestamp, index, url, entry.keys[index]))
+
+        self.refresh_tile_count += len(tile_requests)
+        if len(tile_requests) > 0:
+            self.startWatchdog()
+        self.tile_fetcher.add(tile_requests)
 
+    def startWatchdog(self):
+        if not self.watchdog_timer.isActive():
+            self.watchdog_timer.start(max(1000, self.stall_ms // 4))
+
+    def checkStalled(self):
+        """
+        Every request times out and calls back, but if the pipeline still goes quiet with the manifest or tiles outstanding,
+        we send the manifest again, or drop whatever tiles are in flight and start the fetch over.
+        Tiles we already got come back out of the cache.
+        """
+        if self.manifest.isOverdue():
+            self.manifest.refresh()
+
+        if not self.tile_fetcher.isBusy() and len(self.frame_tiles_map) == 0:
+            if not self.manifest.isPending():
+                self.watchdog_timer.stop()
+            return
+
+        elapsed_ms = Metrics.elapsedMs(self.last_progress)
+        if elapsed_ms < self.stall_ms:
+            return
+
+        print(f"RainViewerRadarProvider.checkStalled(): No tiles in {elapsed_ms:.0f}ms, restarting the fetch")
+        Metrics.increment("radar.stalls")
+        self.tile_fetcher.abort()
+        self.frame_tiles_map = {}
+        self.getTiles()
+
+    def onTile(self, tile_request: TileRequest, tile_bytes: QByteArray):
+        self.last_progress = Metrics.now()
+        frame_tiles = self.frame_tiles_map.get(tile_request.timestamp)
+        if frame_tiles is None:
+            return
+
+        tile_image = self.tile_cache.put(tile_request.key, tile_bytes)
+        tile_digest = self.tile_cache.getDigest(tile_request.key)
+        self.setTileImage(frame_tiles, tile_request.index, self.recolorTile(frame_tiles, tile_request.index, tile_request.key, tile_image), tile_digest, tile_request.retryable)
+
+    def setTileImage(self, frame_tiles: FrameTilesData, index: int, tile_image: QImage, tile_digest: bytes, retryable: bool = True):
+        if tile_image.isNull():
+            # A tile we couldn't get leaves a clear hole, the rest of the frame is still worth showing.
+            frame_tiles.failed = True
+            frame_tiles.retryable = frame_tiles.retryable or retryable
+            tile_image = EMPTY_TILE
+        frame_tiles.tile_images[index] = tile_image
+        frame_tiles.tile_digests[index] = tile_digest
+        frame_tiles.remaining -= 1
+
+        if frame_tiles.remaining == 0:
+            if frame_tiles.failed:
+                # Don't store a frame with holes in it, we go back for the missing tiles later.
+                self.combineTiles(frame_tiles, 0)
             else:
-                # Otherwise we fetch this tile.
-                url = entry.urls[self.tile_url_index]
-                #print(f"pulling timestamp {entry.timestamp} : {url}")
-                request = QNetworkRequest(QUrl(url))
-                self.reply = self.net_man.get(request)
-                self.reply.finished.connect(self.onTile)
+                self.finishFrame(frame_tiles)
+            del self.frame_tiles_map[frame_tiles.timestamp]
+
+    def finishFrame(self, frame_tiles: FrameTilesData):
+        # A frame with the same tiles as one we already have just shares its slot, there is nothing to paint.
+        digest = frame_tiles.getDigest()
+        slot = self.frame_store.findDigest(digest)
+        if slot < 0:
+            self.combineTiles(frame_tiles, digest)
+            return
+
+        Metrics.increment("radar.frames_shared")
+        self.frame_store.commitSlot(slot, frame_tiles.timestamp, digest, self.getPlannedTimestamps())
+        CacheManager.getManager().touch(self.frame_store.file_path)
+        radar_data = RadarData(frame_tiles.timestamp, "", self.frame_store.getSlotImage(slot), self.frame_store, digest)
+        same_radar_data = self.radar_data_list.findDigest(digest)
+        if same_radar_data is not None:
+            radar_data.image = same_radar_data.image
+            radar_data.pixmap = same_radar_data.pixmap
+        self.addFrame(radar_data)
+
+    def getPlannedTimestamps(self) -> set[int]:
+        return set(entry.timestamp for entry in self.frame_planner.getFrames())
+
+    def onTilesDone(self):
+        elapsed_ms = Metrics.elapsedMs(self.refresh_start)
+        Metrics.recordTiming("radar.refresh", elapsed_ms)
+        Metrics.increment("radar.tiles", self.refresh_tile_count)
+        print(f"RainViewerRadarProvider.onTilesDone(): {self.refresh_tile_count} tiles in {elapsed_ms:.0f}ms with {self.tile_fetcher.max_per_host} requests per host")
+        print(f"RainViewerRadarProvider.onTilesDone(): {self.tile_cache}")
+
+        self.tiles_done = True
+        self.checkRefreshDone()
+
+    def combineTiles(self, frame_tiles: FrameTilesData, digest: int):
+        # Hand the tiles to a pool thread, onComposited() picks the finished frame up on the GUI thread.
+        # Partial frames get painted into an image of their own, since they never go in the store.
+        export_file_path = ""
+        if frame_tiles.failed:
+            slot = -1
+            target_image = QImage(self.rect_size, QImage.Format.Format_ARGB32_Premultiplied)
+            image_owner = None
+        else:
+            slot = self.frame_store.allocateSlot(self.getPlannedTimestamps())
+            target_image = self.frame_store.getSlotImage(slot)
+            image_owner = self.frame_store
+            if self.export_png:
+                export_file_path = AssetUtils.getCachedRadarFile(frame_tiles.timestamp, self.latitude, self.longitude, self.zoom, self.rect_size)
+
+        composite_data = CompositeData(
+            self.generation,
+            frame_tiles.timestamp,
+            digest,
+            frame_tiles.tile_images,
+            self.viewport.tiles_width,
+            self.viewport.tiles_height,
+            self.tile_size,
+            self.viewport.x_offset,
+            self.viewport.y_offset,
+            QSize(self.rect_size),
+            slot,
+            target_image,
+            image_owner,
+            export_file_path
+        )
+        composite_data.stored = not frame_tiles.failed
+        composite_data.retryable = frame_tiles.retryable
+        composite_data.color_lut = self.color_lut
+        composite_data.recolor_keys = frame_tiles.recolor_keys
+        frame_tiles.tile_images = []
+
+        self.pending_jobs += 1
+        self.thread_pool.start(RadarCompositeJob(composite_data, self.compositor_signals))
+
+    def onComposited(self, composite_data: CompositeData, radar_data: RadarData):
+        # The job saved any export, but the index is only touched from the GUI thread.
+        if composite_data.export_file_path:
+            CacheManager.getManager().add(composite_data.export_file_path, "rainviewer")
+        # The same goes for the tiles it colored, they're good for any frame that uses them.
+        for variant_key, recolored_image in composite_data.recolored.items():
+            self.tile_cache.remember(variant_key, recolored_image)
+        Metrics.increment("radar.tiles_recolored", len(composite_data.recolored))
+
+        if composite_data.generation != self.generation:
+            # This frame was built for a size we no longer are, and its store has been swapped out.
+            return
+
+        self.pending_jobs -= 1
+        self.last_progress = Metrics.now()
+        if not composite_data.stored:
+            # The frame couldn't go in the store, or was never meant to, so it only lives in memory.
+            if composite_data.slot < 0:
+                # Holes the server says will never fill are as good as this frame gets, so only the others get another go.
+                Metrics.increment("radar.frames_partial")
+                radar_data.partial = composite_data.retryable
+            else:
+                Metrics.increment("radar.palette_overflow")
+                self.frame_store.releaseSlot(composite_data.slot)
+            if self.frame_planner.hasFrame(radar_data.timestamp):
+                self.addFrame(radar_data)
+        elif self.frame_planner.hasFrame(radar_data.timestamp):
+            # Only now does the store say it has this frame, so a half painted slot is never read back.
+            self.frame_store.commitSlot(composite_data.slot, radar_data.timestamp, composite_data.digest, self.getPlannedTimestamps())
+            CacheManager.getManager().touch(self.frame_store.file_path)
+            self.addFrame(radar_data)
+        else:
+            self.frame_store.releaseSlot(composite_data.slot)
+        self.checkRefreshDone()
 
-            #for entry in self.tile_urls_data_list:
-            #    print(f"timestamp {entry.timestamp} urls: {len(entry.urls)}")
-                #urls = entry["urls"]
-                #for url in urls:
-                #    print(f"    {url}")
+    def addFrame(self, radar_data: RadarData):
+        # Every frame goes to the widget as soon as we have it, so the animation grows as the history fills in.
+        self.radar_data_list.add(radar_data)
 
+        if self.first_frame_start is not None:
+            elapsed_ms = Metrics.elapsedMs(self.first_frame_start)
+            self.first_frame_start = None
+            Metrics.recordTiming("radar.first_frame", elapsed_ms)
+            print(f"RainViewerRadarProvider.addFrame(): first radar frame in {elapsed_ms:.0f}ms")
 
+        if callable(self.callback):
+            self.callback(self.radar_data_list)
 
-    def onTile(self):
-        if self.reply.error() == QNetworkReply.NetworkError.NoError:
-            tile_image = QImage()
-            tile_image.loadFromData(self.reply.readAll())
-            self.tile_image_list.append(tile_image)
+    def checkRefreshDone(self):
+        if not self.tiles_done or self.pending_jobs > 0:
+            return
 
-            self.tile_url_index += 1
+        if self.radar_data_list.hasPartial() and not self.retry_timer.isActive():
+            print(f"RainViewerRadarProvider.checkRefreshDone(): Some frames are missing tiles, trying again in {PARTIAL_RETRY_MS // 1000}s")
+            self.retry_timer.start(PARTIAL_RETRY_MS)
 
-            # If we still have tiles to grab, grab em.
-            if self.tile_url_index < len(self.tile_urls_data_list[self.timestamp_index].urls):
-                self.getTilesForTimestamps(self.timestamp_index, self.tile_url_index)
+        if callable(self.callback):
+            self.callback(self.radar_data_list)
 
-            else:
-                # Otherwise we combine our tiles and move on to the next timestamp.
-                self.combineTiles()
-                self.getTilesForTimestamps(self.timestamp_index + 1, 0)
-
-    def combineTiles(self):
-
-        radar_image = QImage(self.tiles_width * Utils.MERCATOR_RANGE, self.tiles_height * Utils.MERCATOR_RANGE, QImage.Format.Format_ARGB32)
-
-        painter = QPainter()
-        painter.begin(radar_image)
-        painter.setPen(QColor(255, 255, 255, 255))
-        painter.setFont(QFont("Arial", 10))
-
-        tile_index = 0
-        x_offset = self.corner_tiles["NW"]["X"]
-        x_offset = int((int(x_offset) - x_offset) * Utils.MERCATOR_RANGE)
-        y_offset = self.corner_tiles["NW"]["Y"]
-        y_offset = int((int(y_offset) - y_offset) * Utils.MERCATOR_RANGE)
-
-        for y in range(0, self.total_height, Utils.MERCATOR_RANGE):
-            for x in range(0, self.total_width, Utils.MERCATOR_RANGE):
-                if self.tile_image_list[tile_index].format() == QImage.Format.Format_ARGB32:
-                    painter.drawImage(x, y, self.tile_image_list[tile_index])
-
-                tile_index += 1
-
-        painter.end()
-        self.tile_image_list = []
-
-        radar_image_2 = radar_image.copy(-x_offset, -y_offset, self.rect_size.width(), self.rect_size.height())
-        painter = QPainter()
-        painter.begin(radar_image_2)
-        timestamp = self.timestamp_list[self.timestamp_index]
-        timestamp_string = "{0:%H:%M} rainvewer.com".format(datetime.fromtimestamp(timestamp))
-        painter.setPen(QColor(255, 255, 255, 255))
-        painter.setFont(QFont("Arial", 10))
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.drawText(5, 13, timestamp_string)
-        painter.end()
-
-        radar_pixmap = QPixmap(radar_image_2)
-        radar_file_name = AssetUtils.getCachedRadarFile(timestamp, self.latitude, self.longitude, self.zoom, self.rect_size)
-        cache_file = QFile(radar_file_name)
-        radar_pixmap.save(cache_file)
-
-        radar_data = RadarData(timestamp, radar_file_name)
-        self.radar_data_list.append(radar_data)
\ No newline at end of file
+        else:
+            print(f"RainViewerRadarProvider.checkRefreshDone(): Bad callback = {self.callback}")
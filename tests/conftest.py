@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# The tests import the app's modules the way WxClockApp.py does, from the top of the repo.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+
+from MetricsUtils import Metrics
+
+
+@pytest.fixture(scope = "session")
+def app():
+    # Timers, images and painters all want an application, one does for the whole run.
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture(autouse = True)
+def metrics():
+    Metrics.counters.clear()
+    Metrics.gauges.clear()
+    Metrics.timings.clear()
+    return Metrics
@@ -0,0 +1,104 @@
+import numpy
+import pytest
+
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QImage
+
+from assets.ImageUtils import ImageUtils
+from radars.RadarCompositor import CompositeData, RadarCompositeJob
+from radars.RadarFrameStore import RadarFrameStore
+from radars.RadarTileCache import EMPTY_TILE
+
+TILE_SIZE = 64
+FRAME_SIZE = QSize(100, 90)
+TIMESTAMP = 1_800_000_000
+
+
+def makeImage(size: QSize, colors: list[int], seed: int) -> QImage:
+    # Plain ARGB32, like decoded tiles, with every pixel one of colors.
+    image = QImage(size, QImage.Format.Format_ARGB32)
+    random = numpy.random.default_rng(seed)
+    pixels = random.choice(numpy.array(colors, dtype = numpy.uint32), (size.height(), size.width()))
+    ImageUtils.getPixelArray(image).view(numpy.uint32)[:, :, 0] = pixels
+    return image
+
+
+def makeColors(count: int, seed: int) -> list[int]:
+    # Scheme-like colors at all sorts of alphas, transparency included.
+    random = numpy.random.default_rng(seed)
+    return [0] + [int(color) for color in random.integers(1, 2 ** 32, count - 1, dtype = numpy.uint64)]
+
+
+def composite(tile_images: list[QImage], target_image: QImage, slot: int, image_owner: object):
+    composite_data = CompositeData(0, TIMESTAMP, 1, list(tile_images), 2, 2, TILE_SIZE, -10, -20, FRAME_SIZE, slot, target_image, image_owner, "")
+    return RadarCompositeJob.combineTiles(composite_data), composite_data
+
+
+def storeImage(store: RadarFrameStore, image: QImage, timestamp: int) -> bool:
+    # The provider's steps for a frame, without the compositing.
+    slot = store.allocateSlot(set())
+    source = image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+    if not store.quantize(source, store.getSlotImage(slot), slot):
+        store.releaseSlot(slot)
+        return False
+    store.commitSlot(slot, timestamp, timestamp, {timestamp})
+    return True
+
+
+def getPremultipliedPixels(image: QImage) -> numpy.ndarray:
+    # The array only points at the image's bits, so the converted image has to outlive the copy.
+    converted_image = image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+    return ImageUtils.getPixelArray(converted_image).copy()
+
+
+@pytest.fixture
+def store(app, tmp_path):
+    return RadarFrameStore(str(tmp_path / "radar.frames"), FRAME_SIZE, 3, indexed = True)
+
+
+def test_indexed_composite_matches_argb(store, tmp_path):
+    colors = makeColors(40, 1)
+    tile_images = [makeImage(QSize(TILE_SIZE, TILE_SIZE), colors, seed) for seed in range(3)] + [EMPTY_TILE]
+
+    argb_data, _ = composite(tile_images, QImage(FRAME_SIZE, QImage.Format.Format_ARGB32_Premultiplied), -1, None)
+
+    slot = store.allocateSlot(set())
+    indexed_data, composite_data = composite(tile_images, store.getSlotImage(slot), slot, store)
+    assert composite_data.stored
+    assert indexed_data.image.format() == QImage.Format.Format_Indexed8
+    store.commitSlot(slot, TIMESTAMP, 1, {TIMESTAMP})
+
+    argb_pixels = getPremultipliedPixels(argb_data.image)
+    assert numpy.array_equal(getPremultipliedPixels(indexed_data.image), argb_pixels)
+
+    # The next run reads the same pixels back out of the file.
+    reopened = RadarFrameStore(store.file_path, FRAME_SIZE, 3, indexed = True)
+    stored_image, digest = reopened.getFrame(TIMESTAMP)
+    assert digest == 1
+    assert numpy.array_equal(getPremultipliedPixels(stored_image), argb_pixels)
+
+
+def test_colors_of_dropped_frames_are_reused(store, metrics):
+    # Each frame takes most of the palette, so two can't live side by side.
+    first_image = makeImage(FRAME_SIZE, makeColors(200, 1), 1)
+    second_image = makeImage(FRAME_SIZE, makeColors(200, 2), 2)
+    small_image = makeImage(FRAME_SIZE, makeColors(40, 3), 3)
+
+    assert storeImage(store, first_image, TIMESTAMP)
+    assert storeImage(store, small_image, TIMESTAMP + 600)
+    assert not storeImage(store, second_image, TIMESTAMP + 1200)
+
+    # Once the first frame is dropped its colors go to the next one, and the frame still around keeps its own.
+    store.clearTimestamp(TIMESTAMP)
+    assert storeImage(store, second_image, TIMESTAMP + 1200)
+    assert metrics.getCounter("radar.palette_reclaimed") > 0
+
+    small_pixels = getPremultipliedPixels(small_image)
+    assert numpy.array_equal(getPremultipliedPixels(store.getFrame(TIMESTAMP + 600)[0]), small_pixels)
+    assert numpy.array_equal(getPremultipliedPixels(store.getFrame(TIMESTAMP + 1200)[0]), getPremultipliedPixels(second_image))
+
+    # The same holds for a store picked back up from the file.
+    reopened = RadarFrameStore(store.file_path, FRAME_SIZE, 3, indexed = True)
+    reopened.clearTimestamp(TIMESTAMP + 1200)
+    assert storeImage(reopened, first_image, TIMESTAMP + 1800)
+    assert numpy.array_equal(getPremultipliedPixels(reopened.getFrame(TIMESTAMP + 600)[0]), small_pixels)
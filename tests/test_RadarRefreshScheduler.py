@@ -0,0 +1,78 @@
+import pytest
+
+import radars.RadarRefreshScheduler as scheduler_module
+from radars.RadarRefreshScheduler import MIN_DELAY_MS, PUBLISH_LAG_MS, RadarRefreshScheduler
+
+CADENCE_SECS = 10 * 60
+NEWEST = 1_800_000_000
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(NEWEST + 60)
+    monkeypatch.setattr(scheduler_module.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture
+def scheduler(app, clock):
+    # Five frames a cadence apart, the newest a minute old, and nothing scheduled yet.
+    scheduler = RadarRefreshScheduler(15 * 60 * 1000, lambda: None)
+    scheduler.onFrames([NEWEST - CADENCE_SECS * step for step in range(4, -1, -1)])
+    scheduler.start()
+    yield scheduler
+    scheduler.stop()
+
+
+def getCadenceDelayMs(clock: Clock, newest: int) -> float:
+    return (newest + CADENCE_SECS - clock.now) * 1000 + PUBLISH_LAG_MS
+
+
+def test_frame_landing_after_due_refresh_is_not_a_miss(scheduler, clock, metrics):
+    clock.now = NEWEST + CADENCE_SECS + PUBLISH_LAG_MS / 1000
+    scheduler.refresh()
+    scheduler.onFrames([NEWEST - CADENCE_SECS * step for step in range(3, -1, -1)] + [NEWEST + CADENCE_SECS])
+
+    assert scheduler.misses == 0
+    assert metrics.getCounter("radar.refresh_misses") == 0
+    assert scheduler.timer.interval() == pytest.approx(getCadenceDelayMs(clock, NEWEST + CADENCE_SECS), abs = 1)
+
+    # The next one lands on time too, still no miss.
+    clock.now = NEWEST + 2 * CADENCE_SECS + PUBLISH_LAG_MS / 1000
+    scheduler.refresh()
+    assert metrics.getCounter("radar.refresh_misses") == 0
+
+
+def test_due_refresh_that_finds_nothing_is_a_miss(scheduler, clock, metrics):
+    clock.now = NEWEST + CADENCE_SECS + PUBLISH_LAG_MS / 1000
+    scheduler.refresh()
+    # Only known to have missed once the next refresh goes out, and by then the frame is overdue, so we back off.
+    assert metrics.getCounter("radar.refresh_misses") == 0
+    assert scheduler.timer.interval() == MIN_DELAY_MS
+
+    clock.now += MIN_DELAY_MS / 1000
+    scheduler.refresh()
+    assert metrics.getCounter("radar.refresh_misses") == 1
+    assert scheduler.timer.interval() == MIN_DELAY_MS * 2
+
+    # Once it shows up, the wait goes back to a cadence.
+    scheduler.onFrames([NEWEST - CADENCE_SECS * step for step in range(3, -1, -1)] + [NEWEST + CADENCE_SECS])
+    assert scheduler.misses == 0
+    assert scheduler.timer.interval() == pytest.approx(getCadenceDelayMs(clock, NEWEST + CADENCE_SECS), abs = 1)
+
+
+def test_early_refresh_that_finds_nothing_is_not_a_miss(scheduler, clock, metrics):
+    # Something else asked early, like a resize, so coming back empty is expected.
+    clock.now = NEWEST + 120
+    scheduler.refresh()
+    clock.now = NEWEST + CADENCE_SECS + PUBLISH_LAG_MS / 1000
+    scheduler.refresh()
+    assert metrics.getCounter("radar.refresh_misses") == 0
@@ -4,8 +4,9 @@ from typing import Any, Callable
 
 from datetime import datetime, timedelta
 from PyQt6.QtCore import QUrl
-from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+from PyQt6.QtNetwork import QNetworkReply, QNetworkRequest
 
+from NetworkUtils import NetworkService, Priority
 from assets.AssetUtils import Icons
 from configs.ConfigUtils import Config
 from weather.WeatherProvider import WeatherProvider
@@ -22,9 +23,7 @@ class OpenWeatherProvider(WeatherProvider):
         self.wx_settings = config.wx_settings
         self.curr_cond_callback = None
         self.forecast_callback = None
-        self.net_man = QNetworkAccessManager(self)
-        self.curr_cond_reply = None
-        self.forecast_reply = None
+        self.network = NetworkService.getService()
 
     @staticmethod
     def getIconType(owm_icon: str) -> str:
@@ -77,19 +76,18 @@ class OpenWeatherProvider(WeatherProvider):
         #print(f"OpenWeatherProvider.getForecast(): url: {wx_url}")
 
         request = QNetworkRequest(QUrl(wx_url))
-        self.forecast_reply = self.net_man.get(request)
-        self.forecast_reply.finished.connect(self.forecastCallback)
+        self.network.get(request, self.forecastCallback, Priority.HIGH)
 
-    def forecastCallback(self):
+    def forecastCallback(self, reply: QNetworkReply):
         # The data returned by the forecast call is in 3 hour increments,
         # where the data in each item is representative of the 3 hours _preceding_ the timestamp
         data_list = []
-        if self.forecast_reply.error() != QNetworkReply.NetworkError.NoError:
+        if reply.error() != QNetworkReply.NetworkError.NoError:
             for _ in range(9):
-                data_list.append(ForecastData.getErrorData(self.forecast_reply.errorString()))
+                data_list.append(ForecastData.getErrorData(reply.errorString()))
 
         else:
-            json_bytes = self.forecast_reply.readAll()
+            json_bytes = reply.readAll()
             json_string = json_bytes.data().decode("utf-8")
             if json_string == "":
                 error_string = "OpenWeatherProvider.forecastCallback: Received empty JSON string for forecast."
@@ -145,8 +143,6 @@ class OpenWeatherProvider(WeatherProvider):
         if callable(self.forecast_callback):
             self.forecast_callback(data_list)
             self.forecast_callback = None
-            self.forecast_reply.close()
-            self.forecast_reply = None
 
         else:
             print(f"OpenWeatherProvider.forecastCallback(): Missing callback.")
@@ -276,16 +272,15 @@ class OpenWeatherProvider(WeatherProvider):
         #print(f"OpenWeatherProvider.getCurrentConditions(): url: {wx_url}")
 
         request = QNetworkRequest(QUrl(wx_url))
-        self.curr_cond_reply = self.net_man.get(request)
-        self.curr_cond_reply.finished.connect(self.currentConditionsCallback)
+        self.network.get(request, self.currentConditionsCallback, Priority.HIGH)
 
-    def currentConditionsCallback(self):
+    def currentConditionsCallback(self, reply: QNetworkReply):
         data = ""
-        if self.curr_cond_reply.error() != QNetworkReply.NetworkError.NoError:
-            data = CurrentConditionsData.getErrorData(self.curr_cond_reply.errorString())
+        if reply.error() != QNetworkReply.NetworkError.NoError:
+            data = CurrentConditionsData.getErrorData(reply.errorString())
 
         else:
-            json_bytes = self.curr_cond_reply.readAll()
+            json_bytes = reply.readAll()
             json_string = json_bytes.data().decode("utf-8")
             if json_string == "":
                 error_string = "OpenWeatherProvider.currentConditionsCallback: Received empty JSON string for current conditions."
@@ -337,8 +332,6 @@ class OpenWeatherProvider(WeatherProvider):
         if callable(self.curr_cond_callback):
             self.curr_cond_callback(data)
             self.curr_cond_callback = None
-            self.curr_cond_reply.close()
-            self.curr_cond_reply = None
 
         else:
             print("OpenWeatherProvider.currentConditionsCallback(): Missing callback.")
\ No newline at end of file
@@ -0,0 +1,114 @@
+from PyQt6.QtCore import QPoint, QRect, QSize, Qt
+from PyQt6.QtGui import QPainter, QPaintEvent, QPixmap, QRegion, QResizeEvent, QTransform
+from PyQt6.QtWidgets import QWidget
+
+from MetricsUtils import Metrics
+from assets.AssetService import AssetService
+from assets.AssetUtils import ClockAssets
+from assets.ClockHandCache import ClockHandUtils, Hand, HAND_ASSETS
+from assets.ImageUtils import ImageUtils
+
+# Smooth rotation bleeds a pixel or so past the hand's own bounds.
+DIRTY_MARGIN = 2
+
+
+class AnalogClockCanvas(QWidget):
+    """
+    The analog clock drawn in one widget instead of four stacked labels.
+    The face is scaled once per size into a backing pixmap, and the hands get painted over it with rotations.
+    When a hand moves, only the area under where it was and where it is now gets repainted.
+    """
+    def __init__(self, assets_color: str, sweep_fps: int = 0, parent: QWidget = None):
+        super().__init__(parent)
+        self.assets_color = assets_color
+        self.sweep_fps = sweep_fps
+
+        self.face_pixmap = QPixmap()
+        self.hand_pixmaps = {}
+        # Each hand's opaque area, relative to the clock's center, before it gets rotated.
+        self.hand_rects = {}
+        self.positions = {}
+        self.clock_center = QPoint()
+
+    def resizeEvent(self, event: QResizeEvent):
+        width = event.size().width()
+        height = event.size().height()
+        clock_dims = min(width, height)
+        if clock_dims <= 0:
+            return
+        self.clock_center = QPoint(width // 2, height // 2)
+
+        # The backing pixmap is the whole widget, so a repaint can copy any part of it straight across.
+        # It stays see through around the face, so the background shows like it does behind the labels.
+        asset_service = AssetService.getService()
+        clock_size = QSize(clock_dims, clock_dims)
+        clock_face_image = asset_service.getImage(self.assets_color, ClockAssets.FACE, clock_size)
+        self.face_pixmap = QPixmap(width, height)
+        self.face_pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(self.face_pixmap)
+        painter.drawImage(self.clock_center - clock_face_image.rect().center(), clock_face_image)
+        painter.end()
+
+        self.hand_pixmaps = {}
+        self.hand_rects = {}
+        for hand, asset_name in HAND_ASSETS.items():
+            hand_image = asset_service.getImage(self.assets_color, asset_name, clock_size)
+            self.hand_pixmaps[hand] = asset_service.getPixmap(self.assets_color, asset_name, clock_size)
+            self.hand_rects[hand] = ImageUtils.getOpaqueRect(hand_image).translated(-(hand_image.width() // 2), -(hand_image.height() // 2))
+
+        self.update()
+
+    def setPositions(self, positions: dict[str, int], repaint: bool = False):
+        """
+        Only hands that moved need repainting, and only over the area they left and the area they're in now.
+        repaint paints them before returning, instead of whenever Qt gets to it, so the caller can time it.
+        """
+        dirty = QRegion()
+        for hand, position in positions.items():
+            old_position = self.positions.get(hand)
+            if old_position == position:
+                continue
+            self.positions[hand] = position
+            if hand not in self.hand_rects:
+                continue
+            if old_position is not None:
+                dirty += self.getHandRect(hand, old_position)
+            dirty += self.getHandRect(hand, position)
+
+        if dirty.isEmpty():
+            return
+        if repaint:
+            self.repaint(dirty)
+        else:
+            self.update(dirty)
+
+    def getHandRect(self, hand: str, position: int) -> QRect:
+        rect = QTransform().rotate(ClockHandUtils.getAngle(hand, position, self.sweep_fps)).mapRect(self.hand_rects[hand])
+        rect.translate(self.clock_center)
+        return rect.adjusted(-DIRTY_MARGIN, -DIRTY_MARGIN, DIRTY_MARGIN, DIRTY_MARGIN)
+
+    def paintEvent(self, event: QPaintEvent):
+        if self.face_pixmap.isNull():
+            return
+
+        paint_start = Metrics.now()
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        # Qt already clips us to the dirty region, and repaints the background under it,
+        # so the face only gets copied where it's needed.
+        painter.drawPixmap(0, 0, self.face_pixmap)
+
+        painter.translate(self.clock_center)
+        for hand in (Hand.HOUR, Hand.MINUTE, Hand.SECOND):
+            hand_pixmap = self.hand_pixmaps.get(hand)
+            if hand_pixmap is None or hand not in self.positions:
+                continue
+            painter.save()
+            painter.rotate(ClockHandUtils.getAngle(hand, self.positions[hand], self.sweep_fps))
+            painter.drawPixmap(-(hand_pixmap.width() // 2), -(hand_pixmap.height() // 2), hand_pixmap)
+            painter.restore()
+        painter.end()
+
+        # PyQt can't hand us the region's rects, so this is the area around them, which is close for a hand or two.
+        Metrics.setGauge("clock.paint_pixels", event.rect().width() * event.rect().height())
+        Metrics.recordTiming("clock.paint", Metrics.elapsedMs(paint_start))
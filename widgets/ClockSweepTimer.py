@@ -0,0 +1,77 @@
+import math
+import time
+from typing import Callable
+
+from MetricsUtils import Metrics
+from TickScheduler import TickScheduler
+
+# Below this the sweep is just a ticking second hand, so there's no point going lower.
+MIN_FPS = 1
+
+# How many seconds of frames get averaged before the frame rate is reconsidered.
+BUDGET_WINDOW_SECS = 2
+
+
+class ClockSweepTimer:
+    """
+    Calls on_frame fps times a second from a TickScheduler animation slot, which keeps frames on boundaries
+    counted from the top of each wall clock second, so the second hand crosses each mark right as the second changes.
+    on_frame has to do all of its drawing before it returns, since that is what gets measured.
+    If frames take more than budget_percent of a core, fps drops to what fits, and creeps back up once there's room.
+    """
+    def __init__(self, max_fps: int, budget_percent: int, on_frame: Callable[[], None]):
+        self.max_fps = max(MIN_FPS, max_fps)
+        self.fps = self.max_fps
+        self.budget = budget_percent / 100.0
+        self.on_frame = on_frame
+        self.window_start = 0.0
+        self.window_ms = 0.0
+        self.window_frames = 0
+        self.slot = None
+
+    def start(self):
+        self.window_start = time.monotonic()
+        self.window_ms = 0.0
+        self.window_frames = 0
+        Metrics.setGauge("clock.sweep_fps", self.fps)
+        self.slot = TickScheduler.getScheduler().addAnimation(self.fps, self.frame)
+
+    def stop(self):
+        if self.slot is not None:
+            self.slot.stop()
+            self.slot = None
+
+    def frame(self):
+        frame_start = Metrics.now()
+        if callable(self.on_frame):
+            self.on_frame()
+        frame_ms = Metrics.elapsedMs(frame_start)
+        Metrics.recordTiming("clock.sweep_frame", frame_ms)
+
+        self.window_ms += frame_ms
+        self.window_frames += 1
+        if time.monotonic() - self.window_start >= BUDGET_WINDOW_SECS:
+            self.adjustRate()
+
+    def adjustRate(self):
+        average_ms = self.window_ms / self.window_frames
+        load = average_ms * self.fps / 1000.0
+        Metrics.setGauge("clock.sweep_load", load)
+
+        if load > self.budget:
+            # Drop straight to the rate that fits, so we don't spend several windows over budget getting there.
+            fps = max(MIN_FPS, min(self.fps - 1, math.floor(self.budget * 1000.0 / average_ms)))
+            if fps != self.fps:
+                print(f"ClockSweepTimer.adjustRate(): {average_ms:.1f}ms frames are over budget, {self.fps} -> {fps} fps")
+                Metrics.increment("clock.sweep_slowdowns")
+                self.fps = fps
+                self.slot.setFps(fps)
+        elif self.fps < self.max_fps and average_ms * (self.fps + 1) / 1000.0 < self.budget * 0.75:
+            # Only step back up when the next rate would leave some headroom, otherwise we'd bounce.
+            self.fps += 1
+            self.slot.setFps(self.fps)
+
+        Metrics.setGauge("clock.sweep_fps", self.fps)
+        self.window_start = time.monotonic()
+        self.window_ms = 0.0
+        self.window_frames = 0
@@ -1,12 +1,16 @@
-import os
-
 from datetime import datetime
-from PyQt6.QtCore import QSize, Qt, QTimer
-from PyQt6.QtGui import QPixmap, QResizeEvent, QTransform
+from PyQt6.QtCore import QPoint, QSize, Qt
+from PyQt6.QtGui import QResizeEvent
 from PyQt6.QtWidgets import QFrame, QLabel
 
-from assets.AssetUtils import AssetUtils
+from MetricsUtils import Metrics
+from TickScheduler import Tick, TickScheduler
+from assets.AssetService import AssetService
+from assets.AssetUtils import ClockAssets
+from assets.ClockHandCache import ClockHandCache, Hand, HAND_ASSETS
 from configs.ConfigUtils import Config
+from widgets.AnalogClockCanvas import AnalogClockCanvas
+from widgets.ClockSweepTimer import ClockSweepTimer
 
 
 class ClockWidget(QFrame):
@@ -19,6 +23,10 @@ class ClockWidget(QFrame):
         self.last_time_string = ""
         # This is for knowing when to update in the analog clock's minute and hour hands.
         self.last_minute = -1
+        # How many positions a second the second hand has, 0 when it just ticks.
+        self.sweep_fps = 0 if self.clock_settings.is_digital else self.clock_settings.sweep_fps
+        # A sweep has far more second hand positions than the hand cache can hold, so it always gets painted.
+        self.is_painted = self.clock_settings.is_painted or self.sweep_fps > 0
 
         if self.clock_settings.is_digital:
             # The digital clock is a single text widget
@@ -33,29 +41,33 @@ class ClockWidget(QFrame):
             self.clock_text_frame.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         else:
-            # Grab the assets, but don't draw them.
-            # We resize the assets in resizeEvent().
-            # Then we draw them there and on tick().
-            assets_folder = AssetUtils.getColorPath(app_settings.color.asset_folder)
-            self.clock_face_pixmap =  QPixmap(os.path.normpath(assets_folder + "/clock_face.png"))
-            self.hour_hand_pixmap =   QPixmap(os.path.normpath(assets_folder + "/hour_hand.png"))
-            self.minute_hand_pixmap = QPixmap(os.path.normpath(assets_folder + "/min_hand.png"))
-            self.second_hand_pixmap = QPixmap(os.path.normpath(assets_folder + "/sec_hand.png"))
-
-            # Create the widgets for the assets.
-            self.clock_face_frame = QLabel(self)
-            self.clock_face_frame.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.hour_hand_frame = QLabel(self)
-            self.hour_hand_frame.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.minute_hand_frame = QLabel(self)
-            self.minute_hand_frame.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.second_hand_frame = QLabel(self)
-            self.second_hand_frame.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-        # Setup a timer to refresh the clock every second.
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.tick)
-        self.timer.start(1000)
+            # The assets get sized for us by the AssetService in resizeEvent(), then we draw them there and on tick().
+            self.assets_color = app_settings.color.asset_folder
+
+            if self.is_painted:
+                # The painted clock does its own sizing and drawing, we just tell it where the hands are.
+                self.clock_canvas = AnalogClockCanvas(self.assets_color, self.sweep_fps, self)
+
+            else:
+                # Every rotation of the hands gets made once per size, so a tick just swaps pixmaps.
+                self.hand_cache = ClockHandCache(self.clock_settings.hand_cache_mb)
+
+                # Create the widgets for the assets.
+                # The hands are cropped down to just the hand, so their frames get moved around to fit them in setHand().
+                self.clock_face_frame = QLabel(self)
+                self.clock_face_frame.setAlignment(Qt.AlignmentFlag.AlignCenter)
+                self.hour_hand_frame = QLabel(self)
+                self.minute_hand_frame = QLabel(self)
+                self.second_hand_frame = QLabel(self)
+                self.clock_center = QPoint()
+
+        if self.sweep_fps > 0:
+            # A sweeping second hand gets animation frames instead, which move the other hands too.
+            self.sweep_timer = ClockSweepTimer(self.sweep_fps, self.clock_settings.sweep_budget, self.tick)
+            self.sweep_timer.start()
+        else:
+            # Refresh the clock right as each second starts.
+            TickScheduler.getScheduler().subscribe(Tick.SECOND, self.tick)
 
     def resizeEvent(self, event: QResizeEvent):
         # Now that we know how big we are, we can resize and draw our stuff.
@@ -65,45 +77,44 @@ class ClockWidget(QFrame):
         if self.clock_settings.is_digital:
             self.clock_text_frame.setGeometry(0, 0, width, height)
 
+        elif self.is_painted:
+            self.clock_canvas.setGeometry(0, 0, width, height)
+            self.tick()
+
         else:
             # Find the narrowest dimension, and that will be our square.
             clock_dims = min(width, height)
+            if clock_dims <= 0:
+                return
 
-            # Resize the clock face.
-            self.clock_face_pixmap = self.clock_face_pixmap.scaled(
-                QSize(clock_dims, clock_dims),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.clock_face_frame.setPixmap(self.clock_face_pixmap)
+            # Size the clock face, a size we've been before is just a lookup.
+            asset_service = AssetService.getService()
+            clock_size = QSize(clock_dims, clock_dims)
+            self.clock_face_frame.setPixmap(asset_service.getPixmap(self.assets_color, ClockAssets.FACE, clock_size))
             self.clock_face_frame.setGeometry(0, 0, width, height)
 
-            # Resize the second hand.
-            self.second_hand_pixmap = self.second_hand_pixmap.scaled(
-                QSize(clock_dims, clock_dims),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.second_hand_frame.setPixmap(self.second_hand_pixmap)
-            self.second_hand_frame.setGeometry(0, 0, width, height)
-
-            # Resize the minute hand.
-            self.minute_hand_pixmap = self.minute_hand_pixmap.scaled(
-                QSize(clock_dims, clock_dims),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.minute_hand_frame.setPixmap(self.minute_hand_pixmap)
-            self.minute_hand_frame.setGeometry(0, 0, width, height)
-
-            # Resize the hour hand.
-            self.hour_hand_pixmap = self.hour_hand_pixmap.scaled(
-                QSize(clock_dims, clock_dims),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.hour_hand_frame.setPixmap(self.hour_hand_pixmap)
-            self.hour_hand_frame.setGeometry(0, 0, width, height)
+            # Size the hands, and have the cache start rotating them.
+            hand_images = {}
+            for hand, asset_name in HAND_ASSETS.items():
+                hand_images[hand] = asset_service.getImage(self.assets_color, asset_name, clock_size)
+            self.hand_cache.setHands(hand_images, ClockWidget.getHandPositions(datetime.now()))
+            self.clock_center = QPoint(width // 2, height // 2)
+
+            # The hands we had up are the wrong size now, so put them all back up.
+            self.last_minute = -1
+            self.tick()
+
+    @staticmethod
+    def getHandPositions(now: datetime, sweep_fps: int = 0) -> dict[str, int]:
+        second = now.second
+        if sweep_fps > 0:
+            # Frames land on fractions of a second, rounding keeps a slightly early or late one on its own position.
+            second = round((now.second + now.microsecond / 1000000) * sweep_fps) % (60 * sweep_fps)
+        return {
+            Hand.SECOND: second,
+            Hand.MINUTE: now.minute,
+            Hand.HOUR: (now.hour % 12) * 60 + now.minute,
+        }
 
     def tick(self):
         now = datetime.now()
@@ -116,30 +127,33 @@ class ClockWidget(QFrame):
                 self.clock_text_frame.setText(time_string)
             self.last_time_string = time_string
 
-        else:
+        elif self.is_painted:
+            tick_start = Metrics.now()
+            # The sweep times each frame, so it has to be drawn by the time we return.
+            self.clock_canvas.setPositions(ClockWidget.getHandPositions(now, self.sweep_fps), repaint = self.sweep_fps > 0)
+            Metrics.recordTiming("clock.tick", Metrics.elapsedMs(tick_start))
+
+        elif self.hand_cache.hand_images:
+            tick_start = Metrics.now()
+            positions = ClockWidget.getHandPositions(now)
+
             # The second hand always gets updated.
-            second_angle = now.second * 6
-            second_hand_pixmap_rot = self.second_hand_pixmap.transformed(
-                QTransform().rotate(second_angle),
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.second_hand_frame.setPixmap(second_hand_pixmap_rot)
+            self.setHand(self.second_hand_frame, Hand.SECOND, positions[Hand.SECOND])
 
             if self.last_minute != now.minute:
                 self.last_minute = now.minute
-                minute_angle = now.minute * 6
-                minute_hand_pixmap_rot = self.minute_hand_pixmap.transformed(
-                    QTransform().rotate(minute_angle),
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                self.minute_hand_frame.setPixmap(minute_hand_pixmap_rot)
-
-                hour_angle = ((now.hour % 12) + now.minute / 60.0) * 30.0
-                hour_hand_pixmap_rot = self.hour_hand_pixmap.transformed(
-                    QTransform().rotate(hour_angle),
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                self.hour_hand_frame.setPixmap(hour_hand_pixmap_rot)
+                self.setHand(self.minute_hand_frame, Hand.MINUTE, positions[Hand.MINUTE])
+                self.setHand(self.hour_hand_frame, Hand.HOUR, positions[Hand.HOUR])
+            Metrics.recordTiming("clock.tick", Metrics.elapsedMs(tick_start))
+
+    def setHand(self, hand_frame: QLabel, hand: str, position: int):
+        pixmap, offset = self.hand_cache.get(hand, position)
+        top_left = self.clock_center + offset
+        hand_frame.setGeometry(top_left.x(), top_left.y(), pixmap.width(), pixmap.height())
+        hand_frame.setPixmap(pixmap)
 
     def cleanup(self):
-        self.timer.stop()
\ No newline at end of file
+        if self.sweep_fps > 0:
+            self.sweep_timer.stop()
+        else:
+            TickScheduler.getScheduler().unsubscribe(Tick.SECOND, self.tick)
\ No newline at end of file
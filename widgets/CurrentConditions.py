@@ -1,7 +1,7 @@
 from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QPixmap
 from PyQt6.QtWidgets import QFrame, QLabel, QVBoxLayout
 
+from assets.AssetService import AssetService
 from assets.AssetUtils import AssetUtils
 from configs.ConfigUtils import AppColor, Config
 from weather.WeatherUtils import WeatherUtils
@@ -103,11 +103,11 @@ class CurrentConditions(QFrame):
         self.weather_provider.getCurrentConditions(self.onUpdatedData)
 
     def onUpdatedData(self, data: CurrentConditionsData):
-        icon_asset = AssetUtils.getIcon(self.app_color.asset_folder, data.icon_type)
-        icon_pixmap = QPixmap(icon_asset)
-        width = self.icon_frame.width()
-        height = self.icon_frame.height()
-        icon_pixmap = icon_pixmap.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        icon_pixmap = AssetService.getService().getPixmap(
+            self.app_color.asset_folder,
+            AssetUtils.getIconAsset(data.icon_type),
+            self.icon_frame.size()
+        )
         self.icon_frame.setPixmap(icon_pixmap)
         self.icon_desc_frame.setText(data.icon_description)
         self.temp_frame.setText(data.temp)
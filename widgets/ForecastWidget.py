@@ -1,7 +1,7 @@
 from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QPixmap
 from PyQt6.QtWidgets import QFrame, QHBoxLayout, QLabel, QVBoxLayout
 
+from assets.AssetService import AssetService
 from assets.AssetUtils import AssetUtils
 from configs.ConfigUtils import AppColor, Config
 from weather.WeatherData import ForecastData
@@ -77,11 +77,11 @@ class ForecastEntryWidget(QFrame):
         self.setLayout(layout)
 
     def onUpdatedData(self, data: ForecastData):
-        icon_asset = AssetUtils.getIcon(self.app_color.asset_folder, data.icon_type)
-        icon_pixmap = QPixmap(icon_asset)
-        width = self.icon_frame.width()
-        height = self.icon_frame.height()
-        icon_pixmap = icon_pixmap.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        icon_pixmap = AssetService.getService().getPixmap(
+            self.app_color.asset_folder,
+            AssetUtils.getIconAsset(data.icon_type),
+            self.icon_frame.size()
+        )
         self.icon_frame.setPixmap(icon_pixmap)
         self.description_frame.setText(data.icon_description)
 
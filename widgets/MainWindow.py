@@ -4,6 +4,7 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QKeyEvent, QPixmap
 from PyQt6.QtWidgets import QApplication, QFrame, QGridLayout, QLabel, QMainWindow
 
+from assets.CacheManager import CacheManager
 from configs.ConfigUtils import Config
 from widgets.ClockWidget import ClockWidget
 from widgets.CurrentConditions import CurrentConditions
@@ -38,8 +39,13 @@ class MainWindow(QMainWindow):
         # Build all our widgets.
         self.background_frame = QLabel()
         self.cur_cond_widget = CurrentConditions(config)
-        self.radar_0_widget = RadarWidget(config, config.wx_settings.radar_0_zoom)
-        self.radar_1_widget = RadarWidget(config, config.wx_settings.radar_1_zoom)
+        self.radar_0_widget = RadarWidget(config, config.wx_settings.radar_0_zoom, config.wx_settings.radar_0_tile_size)
+        self.radar_1_widget = RadarWidget(
+            config,
+            config.wx_settings.radar_1_zoom,
+            config.wx_settings.radar_1_tile_size,
+            config.wx_settings.radar_stagger_secs
+        )
         self.header_widget = TextWidget(TextWidget.Position.HEADER, config)
         self.clock_widget = ClockWidget(config)
         self.footer_widget = TextWidget(TextWidget.Position.FOOTER, config)
@@ -95,10 +101,12 @@ class MainWindow(QMainWindow):
 
     def cleanup(self):
         self.clock_widget.cleanup()
+        self.header_widget.cleanup()
         self.cur_cond_widget.cleanup()
         self.forecast_widget.cleanup()
         self.radar_0_widget.cleanup()
         self.radar_1_widget.cleanup()
+        CacheManager.getManager().close()
 
     def keyPressEvent(self, event: QKeyEvent):
         if event.key() == Qt.Key.Key_F4:
@@ -1,20 +1,28 @@
 import math
-import os
+from datetime import datetime
 
 from PyQt6.QtCore import QSize, QSizeF, Qt, QTimer
-from PyQt6.QtGui import QPixmap, QResizeEvent, QColor, QImage, QRgba64
+from PyQt6.QtGui import QPixmap, QResizeEvent, QImage
 from PyQt6.QtWidgets import QFrame, QLabel, QStackedLayout, QSizePolicy
 
 import DebugUtils
+from MetricsUtils import Metrics
+from TickScheduler import Tick, TickScheduler
 from assets.AssetUtils import AssetUtils
+from assets.CacheManager import CacheManager
+from assets.ImageUtils import ImageUtils
 from configs.ConfigUtils import Config
 from maps.MapUtils import MapUtils
-from radars.RadarData import RadarData, SizeData
+from radars.RadarData import RadarFrameRing, SizeData
+from radars.RadarRefreshScheduler import RadarRefreshScheduler
 from radars.RadarUtils import RadarUtils
 
 
+RESIZE_SETTLE_MS = 250
+
+
 class RadarWidget(QFrame):
-    def __init__(self, config: Config, zoom: int):
+    def __init__(self, config: Config, zoom: int, tile_size: int = 256, stagger_secs: int = 0):
         super().__init__()
 
         location = config.app_settings.location
@@ -23,48 +31,53 @@ class RadarWidget(QFrame):
         self.show_map = config.wx_settings.show_map
         self.map_provider = MapUtils.getMapProvider(config)
         self.radar_provider = RadarUtils.getRadarProvider(config)
+        self.radar_provider.setStagger(stagger_secs * 1000)
         self.radar_refresh = config.wx_settings.radar_refresh
         self.radar_data_index = 0
         self.radar_data_list = []
         self.zoom = zoom
         self.file_zoom = zoom
+        self.tile_size = tile_size
 
         self.map_frame = QLabel()
         self.radar_frame = QLabel()
+        self.radar_digest = 0
+
+        # Frames carry no label, so frames that look the same are the same, and the time goes on top of them here.
+        self.time_frame = QLabel()
+        self.time_frame.setStyleSheet("color: #FFFFFF;\nfont-family: Arial;\nfont-size: 13px;")
+        self.time_frame.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
+        self.time_frame.setContentsMargins(5, 0, 0, 0)
 
         self.marker_frame = QLabel()
         self.show_marker = config.wx_settings.show_map and config.wx_settings.show_marker
         if self.show_marker:
-            self.marker_image = QImage(AssetUtils.getMarkerFile("teardrop_dot"))
-            # Color the stupid marker.
-            app_color = config.app_settings.color.rgba
-            (acr, acg, acb, aca) = QColor.fromRgb(app_color[0], app_color[1], app_color[2], app_color[3]).getRgbF()
-            for x in range (0, self.marker_image.width()):
-                for y in range (0, self.marker_image.height()):
-                    (r, g, b, a)= self.marker_image.pixelColor(x, y).getRgbF()
-                    r = r * acr
-                    g = g * acg
-                    b = b * acb
-                    self.marker_image.setPixel(x, y, QColor.fromRgbF(r, g, b, a).rgba())
-
-            self.marker_frame.setPixmap(QPixmap.fromImage(self.marker_image))
+            # The marker gets colored and scaled once we know our size, in getMarker().
+            self.marker_name = "teardrop_dot"
+            self.marker_color = config.app_settings.color
             self.marker_frame.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
-            self.current_marker = self.marker_image
-
         layout = QStackedLayout()
         layout.setStackingMode(QStackedLayout.StackingMode.StackAll)
         layout.addWidget(self.map_frame)
         layout.addWidget(self.radar_frame)
         layout.addWidget(self.marker_frame)
+        layout.addWidget(self.time_frame)
         self.setLayout(layout)
 
         if self.radar_refresh > 0:
-            self.animation_timer = QTimer()
-            self.animation_timer.timeout.connect(self.tick)
-            self.animation_timer.start(1000)
+            # Frames step along with the clock's seconds, so we share its wakeups.
+            TickScheduler.getScheduler().subscribe(Tick.SECOND, self.tick)
+
+            # Refreshes line up with when new frames get published, radar_refresh is just the longest we go without one.
+            self.refresh_scheduler = RadarRefreshScheduler(self.radar_refresh * 60 * 1000, self.getRadar)
 
-            self.radar_fetch_timer = QTimer()
+        # Layout passes at startup resize us several times, so we wait for the size to settle before doing anything.
+        self.viewport_size = QSize()
+        self.resize_timer = QTimer()
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(RESIZE_SETTLE_MS)
+        self.resize_timer.timeout.connect(self.onViewportChanged)
 
     def getShrunkenSize(self, size: QSize) -> QSize:
         temp_size = size
@@ -82,8 +95,9 @@ class RadarWidget(QFrame):
             self.file_zoom,
             map_pixmap.size()
         )
-        if not os.path.exists(cached_map_file):
-            map_pixmap.save(cached_map_file)
+        if not CacheManager.getManager().has(cached_map_file):
+            if map_pixmap.save(cached_map_file):
+                CacheManager.getManager().add(cached_map_file, "RadarWidget")
 
         if map_pixmap.size() != self.size():
             map_pixmap = map_pixmap.scaled(
@@ -95,8 +109,15 @@ class RadarWidget(QFrame):
         self.map_frame.setPixmap(map_pixmap)
 
     def resizeEvent(self, event: QResizeEvent):
-        # On resize we kick off our map and radar stuff.
-        size = self.getShrunkenSize(event.size())
+        # Every resize restarts the settle timer, so only the last one kicks off our map and radar stuff.
+        self.resize_timer.start()
+
+    def onViewportChanged(self):
+        size = self.getShrunkenSize(self.size())
+        if size == self.viewport_size:
+            # We ended up back where we started, everything we have is still good.
+            return
+        self.viewport_size = size
 
         if self.show_map:
             self.map_provider.getMap(
@@ -109,36 +130,66 @@ class RadarWidget(QFrame):
 
         if self.radar_refresh > 0:
             # Now that our sizes are set, we can set up the radar provider.
-            size_data = SizeData(self.file_zoom, size)
+            size_data = SizeData(self.file_zoom, size, self.tile_size)
             self.radar_provider.setSize(size_data)
 
-            # Now that we have everything setup, we can fetch once and setup the timer.
+            # Now that we have everything setup, we can fetch once and (re)start the scheduler.
             self.getRadar()
-            self.radar_fetch_timer.timeout.connect(self.getRadar)
-            self.radar_fetch_timer.start(self.radar_refresh * 60 * 1000)
+            self.refresh_scheduler.start()
 
         if self.show_marker:
             marker_scaled_size = math.ceil(size.height() / 5)
             print(f"marker_scaled_size: {marker_scaled_size}")
-            self.current_marker = self.marker_image.scaled(marker_scaled_size, marker_scaled_size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+            self.current_marker = self.getMarker(marker_scaled_size)
             self.marker_frame.setPixmap(QPixmap.fromImage(self.current_marker))
 
+    def getMarker(self, marker_size: int) -> QImage:
+        # Colored, scaled markers are cached on disk, so we only pay for tinting the first time we see a size.
+        cached_marker_file = AssetUtils.getCachedMarkerFile(self.marker_name, self.marker_color.hex_value, marker_size)
+        if CacheManager.getManager().has(cached_marker_file):
+            marker_image = QImage(cached_marker_file)
+            if not marker_image.isNull():
+                return marker_image
+
+        marker_image = ImageUtils.tint(QImage(AssetUtils.getMarkerFile(self.marker_name)), self.marker_color.rgba)
+        marker_image = marker_image.scaled(marker_size, marker_size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        if marker_image.save(cached_marker_file):
+            CacheManager.getManager().add(cached_marker_file, AssetUtils.getMarkerFile(self.marker_name))
+        return marker_image
+
     def getRadar(self):
         self.radar_provider.getRadar(self.onRadar)
 
-    def onRadar(self, radar_data_list: list[RadarData]):
+    def onRadar(self, radar_data_list: RadarFrameRing):
+        is_new_list = radar_data_list is not self.radar_data_list
         self.radar_data_list = radar_data_list
+        self.refresh_scheduler.onFrames([radar_data.timestamp for radar_data in radar_data_list])
+
+        # Put the first frame of a new list up right away instead of waiting on the next tick.
+        if is_new_list and len(self.radar_data_list) > 0:
+            self.radar_data_index = len(self.radar_data_list) - 1
+            self.radar_digest = 0
+            self.tick()
 
     def tick(self):
         if len(self.radar_data_list) > 0:
+            tick_start = Metrics.now()
+            self.radar_data_index %= len(self.radar_data_list)
             radar_data = self.radar_data_list[self.radar_data_index]
-            radar_pixmap = QPixmap()
-            radar_pixmap.load(radar_data.file_path)
-            self.radar_frame.setPixmap(radar_pixmap)
+
+            # In dry weather frames often look the same, then only the time needs to change.
+            if radar_data.digest == 0 or radar_data.digest != self.radar_digest:
+                self.radar_frame.setPixmap(radar_data.getPixmap())
+                self.radar_digest = radar_data.digest
+            else:
+                Metrics.increment("radar.tick_skipped")
+            self.time_frame.setText("{0:%H:%M} rainvewer.com".format(datetime.fromtimestamp(radar_data.timestamp)))
             self.radar_data_index += 1
             self.radar_data_index %= len(self.radar_data_list)
+            Metrics.recordTiming("radar.tick", Metrics.elapsedMs(tick_start))
 
     def cleanup(self):
+        self.resize_timer.stop()
         if self.radar_refresh > 0:
-            self.animation_timer.stop()
-            self.radar_fetch_timer.stop()
\ No newline at end of file
+            TickScheduler.getScheduler().unsubscribe(Tick.SECOND, self.tick)
+            self.refresh_scheduler.stop()
\ No newline at end of file
@@ -1,9 +1,10 @@
 from datetime import datetime
 
-from PyQt6.QtCore import QTimer, Qt
+from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QResizeEvent
 from PyQt6.QtWidgets import QFrame, QLabel
 
+from TickScheduler import Tick, TickScheduler
 from configs.ConfigUtils import Config
 
 class TextWidget(QFrame):
@@ -32,10 +33,8 @@ class TextWidget(QFrame):
             """
             self.text_box.setStyleSheet(style)
 
-            # Setup a timer to refresh the day second.
-            self.timer = QTimer()
-            self.timer.timeout.connect(self.tick)
-            self.timer.start(1000)
+            # The date only changes at midnight, so that's the only time we need to wake up.
+            TickScheduler.getScheduler().subscribe(Tick.DAY, self.tick)
 
             # Call tick() once to initialize our text.
             self.tick()
@@ -67,4 +66,8 @@ class TextWidget(QFrame):
                 sup = 'rd'
 
             date_string = self.app_settings.date_format.format(now, sup)
-            self.text_box.setText(date_string)
\ No newline at end of file
+            self.text_box.setText(date_string)
+
+    def cleanup(self):
+        if self.position == TextWidget.Position.HEADER:
+            TickScheduler.getScheduler().unsubscribe(Tick.DAY, self.tick)
\ No newline at end of file